@@ -0,0 +1,32 @@
+-- Enforce one batch row per OneDrive folder so ingest_batch can upsert atomically
+-- (replaces the SELECT-then-INSERT existence check that raced under concurrent n8n calls)
+
+-- The race may already have created duplicate folders, which would make the unique index fail
+-- with a bare "could not create unique index". Report every duplicate (batch ids and check counts)
+-- and stop instead - each duplicate carries its own checks, so which row to keep is a manual call
+DO $$
+DECLARE
+    v_dup record;
+    v_found boolean := false;
+BEGIN
+    FOR v_dup IN
+        SELECT b.folder_name,
+               array_agg(b.id ORDER BY b.id) AS batch_ids,
+               array_agg((SELECT count(*) FROM checks c WHERE c.batch_id_fk = b.id) ORDER BY b.id) AS check_counts
+          FROM batches b
+         WHERE b.folder_name IS NOT NULL
+         GROUP BY b.folder_name
+        HAVING count(*) > 1
+    LOOP
+        v_found := true;
+        RAISE WARNING 'Duplicate batches for folder_name %: ids % (checks per batch %)',
+            v_dup.folder_name, v_dup.batch_ids, v_dup.check_counts;
+    END LOOP;
+
+    IF v_found THEN
+        RAISE EXCEPTION 'batches.folder_name has duplicates (listed above) - merge or delete them, then re-run';
+    END IF;
+END;
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS batches_folder_name_key ON batches (folder_name);
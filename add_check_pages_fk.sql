@@ -0,0 +1,43 @@
+-- Foreign key so PostgREST can embed pages in a checks select: checks?select=...,check_pages(*)
+-- Used by GET /api/checks/<check_id>/with-pages
+-- Only added when check_pages.check_id has no FK yet - a second one would make the embed ambiguous
+-- Added NOT VALID first: pages of checks deleted before delete_check cleaned up after itself are
+-- left orphaned, so they're removed before the constraint is validated against existing rows
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+          FROM pg_constraint con
+          JOIN pg_attribute att
+            ON att.attrelid = con.conrelid
+           AND att.attnum = ANY(con.conkey)
+         WHERE con.contype = 'f'
+           AND con.conrelid = 'check_pages'::regclass
+           AND con.confrelid = 'checks'::regclass
+           AND att.attname = 'check_id'
+    ) THEN
+        ALTER TABLE check_pages
+            ADD CONSTRAINT check_pages_check_id_fkey
+            FOREIGN KEY (check_id) REFERENCES checks(id) ON DELETE CASCADE NOT VALID;
+    END IF;
+END;
+$$;
+
+DELETE FROM check_pages p
+ WHERE NOT EXISTS (SELECT 1 FROM checks c WHERE c.id = p.check_id);
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_constraint
+         WHERE conname = 'check_pages_check_id_fkey'
+           AND conrelid = 'check_pages'::regclass
+           AND NOT convalidated
+    ) THEN
+        ALTER TABLE check_pages VALIDATE CONSTRAINT check_pages_check_id_fkey;
+    END IF;
+END;
+$$;
+
+-- Replaced by the embedded select
+DROP FUNCTION IF EXISTS get_check_with_pages(uuid);
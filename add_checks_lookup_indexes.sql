@@ -0,0 +1,5 @@
+-- Composite indexes for the hot list queries in routes/api_routes.py
+--   get_batch_checks: WHERE batch_id = ? ORDER BY created_at DESC
+--   get_check_pages:  WHERE check_id = ? ORDER BY page_number
+CREATE INDEX IF NOT EXISTS checks_batch_id_created_at_idx ON checks (batch_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS check_pages_check_id_page_number_idx ON check_pages (check_id, page_number);
@@ -0,0 +1,12 @@
+-- Mark approvals whose merge + validated_at stamp were deferred to the background
+-- Set by POST /api/checks/approve/<check_id>, cleared when finish_approval_merge writes validated_at.
+-- requeue_stale_approvals only sweeps rows carrying the marker, so older checks that are
+-- approved without validated_at are never merged or sent to Salesforce after the fact
+ALTER TABLE checks
+ADD COLUMN IF NOT EXISTS merge_queued_at timestamptz;
+
+COMMENT ON COLUMN checks.merge_queued_at IS 'When the background PDF merge for this approval was queued (NULL once it finished)';
+
+-- Replaces the status/validated_at partial index from add_checks_lookup_indexes.sql
+DROP INDEX IF EXISTS checks_pending_approval_merge_idx;
+CREATE INDEX IF NOT EXISTS checks_merge_queued_at_idx ON checks (merge_queued_at) WHERE merge_queued_at IS NOT NULL;
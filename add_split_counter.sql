@@ -0,0 +1,53 @@
+-- Track split numbering on the parent check instead of scanning file names
+-- Used by POST /api/checks/split/<check_id> - apply_check_split() bumps the counter in the split's transaction
+ALTER TABLE checks
+ADD COLUMN IF NOT EXISTS split_counter integer NOT NULL DEFAULT 1,
+ADD COLUMN IF NOT EXISTS parent_check_id uuid REFERENCES checks(id) ON DELETE SET NULL;
+
+COMMENT ON COLUMN checks.split_counter IS 'Highest split suffix handed out for this check (1 = never split)';
+COMMENT ON COLUMN checks.parent_check_id IS 'Check this record was split from - its split_counter numbers further splits';
+
+-- Backfill from existing file names ({batch}-{check_num}-{suffix}.pdf)
+WITH parsed AS (
+    SELECT id,
+           split_part(regexp_replace(file_name, '(\.pdf|-COMPLETE)', '', 'g'), '-', 1) AS batch_prefix,
+           split_part(regexp_replace(file_name, '(\.pdf|-COMPLETE)', '', 'g'), '-', 2) AS check_num,
+           split_part(regexp_replace(file_name, '(\.pdf|-COMPLETE)', '', 'g'), '-', 3) AS suffix
+      FROM checks
+     WHERE file_name IS NOT NULL
+),
+parents AS (
+    SELECT id, batch_prefix, check_num FROM parsed WHERE suffix = 'main'
+),
+counters AS (
+    SELECT batch_prefix, check_num, max(suffix::int) AS max_suffix
+      FROM parsed
+     WHERE suffix ~ '^[0-9]+$'
+     GROUP BY batch_prefix, check_num
+)
+UPDATE checks c
+   SET split_counter = GREATEST(c.split_counter, counters.max_suffix)
+  FROM parents
+  JOIN counters USING (batch_prefix, check_num)
+ WHERE c.id = parents.id;
+
+-- Point existing numbered splits at their -main check so they share its counter
+WITH parsed AS (
+    SELECT id,
+           split_part(regexp_replace(file_name, '(\.pdf|-COMPLETE)', '', 'g'), '-', 1) AS batch_prefix,
+           split_part(regexp_replace(file_name, '(\.pdf|-COMPLETE)', '', 'g'), '-', 2) AS check_num,
+           split_part(regexp_replace(file_name, '(\.pdf|-COMPLETE)', '', 'g'), '-', 3) AS suffix
+      FROM checks
+     WHERE file_name IS NOT NULL
+)
+UPDATE checks c
+   SET parent_check_id = parent.id
+  FROM parsed child
+  JOIN parsed parent
+    ON parent.batch_prefix = child.batch_prefix
+   AND parent.check_num = child.check_num
+   AND parent.suffix = 'main'
+ WHERE c.id = child.id
+   AND child.suffix ~ '^[0-9]+$'
+   AND child.suffix <> '1'
+   AND c.parent_check_id IS NULL;
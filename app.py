@@ -24,7 +24,10 @@ Last Updated: September 2025
 """
 
 from flask import Flask
+from flask_compress import Compress
 from config import Config
+from utils.json_provider import OrjsonProvider
+from utils.pdf_worker import warm_up_pdf_pipeline, start_pdf_worker_pool
 
 # =============================================================================
 # BLUEPRINT IMPORTS - Route Module Registration
@@ -34,7 +37,7 @@ from config import Config
 from routes.auth_routes import auth_bp
 from routes.dashboard_routes import dashboard_bp
 from routes.status_routes import status_bp 
-from routes.api_routes import api_bp
+from routes.api_routes import api_bp, start_approval_sweeper
 from routes.batch_process_route import batch_process_bp
 
 # === AI Service Integration - With Error Handling ===
@@ -52,6 +55,7 @@ except ImportError as e:
 # =============================================================================
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 config = Config()
 
 # =============================================================================
@@ -75,6 +79,18 @@ app.config.update(
     SESSION_SERIALIZATION_FORMAT=config.SESSION_SERIALIZATION_FORMAT,
 ) 
 
+# =============================================================================
+# RESPONSE COMPRESSION - JSON only (check lists, details, Salesforce matches)
+# =============================================================================
+
+app.config.update(
+    COMPRESS_MIMETYPES=['application/json'],
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+    COMPRESS_MIN_SIZE=1024,
+    COMPRESS_STREAMS=False,  # split-pages streams page by page - leave it unbuffered
+)
+Compress(app)
+
 # =============================================================================
 # ENVIRONMENT DETECTION & CONFIGURATION
 # =============================================================================
@@ -100,6 +116,30 @@ if CHAT_ROUTES_AVAILABLE:
 else:
     print("⚠️ Chat routes NOT registered - check services/ai_service.py")
 
+# =============================================================================
+# PDF PIPELINE WARM-UP - Pay MuPDF first-use cost at boot, not on first upload
+# =============================================================================
+
+try:
+    warm_up_pdf_pipeline()
+    print("✅ PDF pipeline warmed up")
+except Exception as e:
+    print(f"⚠️ PDF pipeline warm-up failed: {e}")
+
+# Spawn the PDF worker processes now so the first large upload doesn't wait on them
+try:
+    start_pdf_worker_pool()
+    print("✅ PDF worker pool started")
+except Exception as e:
+    print(f"⚠️ PDF worker pool failed to start: {e}")
+
+# =============================================================================
+# APPROVAL SWEEPER - Re-run approval merges lost to a restart or failed update
+# =============================================================================
+
+start_approval_sweeper()
+print("✅ Approval sweeper started")
+
 # =============================================================================
 # CUSTOM TEMPLATE FILTERS
 # =============================================================================
@@ -0,0 +1,113 @@
+-- Insert the new split check and shrink the original in one transaction
+-- Used by POST /api/checks/split/<check_id>
+-- batch_images is partitioned here so the page array never travels to the app and back,
+-- and image_data/image_mime_type are copied to the new check server-side for the same reason
+-- Only keys that are real checks columns are written; anything else in the payloads is ignored
+-- When p_split_name_prefix is given the split suffix is taken from the parent's split_counter
+-- here too, so a failed split rolls the counter back instead of leaving a gap in the numbering
+DROP FUNCTION IF EXISTS apply_check_split(uuid, jsonb, jsonb);
+DROP FUNCTION IF EXISTS apply_check_split(uuid, int[], jsonb, jsonb);
+DROP FUNCTION IF EXISTS next_split_suffix(uuid);
+
+CREATE OR REPLACE FUNCTION apply_check_split(
+    p_check_id uuid,
+    p_selected_indices int[],
+    p_new_check jsonb,
+    p_original_update jsonb,
+    p_parent_id uuid DEFAULT NULL,
+    p_split_name_prefix text DEFAULT NULL
+)
+RETURNS json
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_images jsonb;
+    v_image_data checks.image_data%TYPE;
+    v_image_mime_type checks.image_mime_type%TYPE;
+    v_page_count int;
+    v_split jsonb;
+    v_remaining jsonb;
+    v_new_cols text;
+    v_update_cols text;
+    v_new_check json;
+    v_original json;
+    v_split_suffix int;
+BEGIN
+    -- Lock the original so a concurrent split can't partition the same pages
+    SELECT batch_images, image_data, image_mime_type
+      INTO v_images, v_image_data, v_image_mime_type
+      FROM checks WHERE id = p_check_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Check % not found', p_check_id;
+    END IF;
+
+    v_page_count := COALESCE(jsonb_array_length(v_images), 0);
+    IF v_page_count = 0 THEN
+        RAISE EXCEPTION 'No pages found in current check';
+    END IF;
+    IF EXISTS (SELECT 1 FROM unnest(p_selected_indices) AS s(idx) WHERE idx < 0 OR idx >= v_page_count) THEN
+        RAISE EXCEPTION 'Invalid page index selected';
+    END IF;
+
+    -- Page order is kept on both sides (ordinality is 1-based, indices are 0-based)
+    SELECT COALESCE(jsonb_agg(e.v ORDER BY e.i) FILTER (WHERE e.i - 1 = ANY(p_selected_indices)), '[]'::jsonb),
+           COALESCE(jsonb_agg(e.v ORDER BY e.i) FILTER (WHERE NOT (e.i - 1 = ANY(p_selected_indices))), '[]'::jsonb)
+      INTO v_split, v_remaining
+      FROM jsonb_array_elements(v_images) WITH ORDINALITY AS e(v, i);
+
+    IF jsonb_array_length(v_remaining) = 0 THEN
+        RAISE EXCEPTION 'Cannot split all pages - at least one page must remain';
+    END IF;
+
+    -- Next split suffix ({prefix}-{n}.pdf) from the parent's counter - the row lock serializes concurrent splits
+    IF p_split_name_prefix IS NOT NULL THEN
+        UPDATE checks
+           SET split_counter = split_counter + 1
+         WHERE id = COALESCE(p_parent_id, p_check_id)
+        RETURNING split_counter INTO v_split_suffix;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'Parent check % not found', COALESCE(p_parent_id, p_check_id);
+        END IF;
+        p_new_check := p_new_check || jsonb_build_object(
+            'file_name', p_split_name_prefix || '-' || v_split_suffix || '.pdf');
+    END IF;
+
+    p_new_check := p_new_check || jsonb_build_object(
+        'batch_images', v_split, 'page_count', jsonb_array_length(v_split),
+        'image_data', v_image_data, 'image_mime_type', v_image_mime_type);
+    p_original_update := p_original_update || jsonb_build_object(
+        'batch_images', v_remaining, 'page_count', jsonb_array_length(v_remaining));
+
+    SELECT string_agg(quote_ident(a.attname), ', ')
+      INTO v_new_cols
+      FROM pg_attribute a
+     WHERE a.attrelid = 'checks'::regclass
+       AND a.attnum > 0
+       AND NOT a.attisdropped
+       AND p_new_check ? a.attname;
+
+    SELECT string_agg(quote_ident(a.attname), ', ')
+      INTO v_update_cols
+      FROM pg_attribute a
+     WHERE a.attrelid = 'checks'::regclass
+       AND a.attnum > 0
+       AND NOT a.attisdropped
+       AND p_original_update ? a.attname;
+
+    -- Columns missing from the payload keep their defaults (id, flags, ...)
+    -- Only ids, names and counts come back - not the page arrays
+    EXECUTE format(
+        'INSERT INTO checks (%1$s) SELECT %1$s FROM jsonb_populate_record(NULL::checks, $1) '
+        'RETURNING json_build_object(''id'', checks.id, ''file_name'', checks.file_name, ''page_count'', checks.page_count)',
+        v_new_cols
+    ) USING p_new_check INTO v_new_check;
+
+    EXECUTE format(
+        'UPDATE checks SET (%1$s) = (SELECT %1$s FROM jsonb_populate_record(NULL::checks, $1)) '
+        'WHERE id = $2 RETURNING json_build_object(''id'', checks.id, ''file_name'', checks.file_name, ''page_count'', checks.page_count)',
+        v_update_cols
+    ) USING p_original_update, p_check_id INTO v_original;
+
+    RETURN json_build_object('new_check', v_new_check, 'original', v_original, 'split_suffix', v_split_suffix);
+END;
+$$;
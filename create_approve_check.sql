@@ -0,0 +1,64 @@
+-- Approve a check in one round trip and hand its pages back for the background merge
+-- Used by POST /api/checks/approve/<check_id>
+-- batch_images is read from the locked row, never from the client. With pages the approval is
+-- deferred (merge_queued_at set, p_trigger left for finish_approval_merge); without pages
+-- p_trigger (validated_at / n8n_sync_enabled) is written straight away.
+-- An already-approved check is left untouched and its current state is returned instead
+-- Only keys that are real checks columns are written; anything else in p_update is ignored
+CREATE OR REPLACE FUNCTION approve_check(
+    p_check_id uuid,
+    p_update jsonb,
+    p_trigger jsonb
+)
+RETURNS json
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_status checks.status%TYPE;
+    v_validated_at checks.validated_at%TYPE;
+    v_validated_by checks.validated_by%TYPE;
+    v_merge_queued_at checks.merge_queued_at%TYPE;
+    v_images jsonb;
+    v_merge_queued boolean;
+    v_update_cols text;
+BEGIN
+    -- Lock the row so two approvals can't both pass the status check
+    SELECT status, validated_at, validated_by, merge_queued_at, batch_images
+      INTO v_status, v_validated_at, v_validated_by, v_merge_queued_at, v_images
+      FROM checks WHERE id = p_check_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN json_build_object('found', false);
+    END IF;
+
+    IF v_status = 'approved' THEN
+        RETURN json_build_object(
+            'found', true, 'approved', false,
+            'validated_at', v_validated_at, 'validated_by', v_validated_by,
+            'merge_queued_at', v_merge_queued_at, 'batch_images', v_images);
+    END IF;
+
+    v_merge_queued := COALESCE(jsonb_array_length(v_images), 0) > 0;
+    IF v_merge_queued THEN
+        p_update := p_update || jsonb_build_object('merge_queued_at', now());
+    ELSE
+        p_update := p_update || p_trigger;
+    END IF;
+
+    SELECT string_agg(quote_ident(a.attname), ', ')
+      INTO v_update_cols
+      FROM pg_attribute a
+     WHERE a.attrelid = 'checks'::regclass
+       AND a.attnum > 0
+       AND NOT a.attisdropped
+       AND p_update ? a.attname;
+
+    EXECUTE format(
+        'UPDATE checks SET (%1$s) = (SELECT %1$s FROM jsonb_populate_record(NULL::checks, $1)) WHERE id = $2',
+        v_update_cols
+    ) USING p_update, p_check_id;
+
+    RETURN json_build_object(
+        'found', true, 'approved', true, 'merge_queued', v_merge_queued,
+        'batch_images', CASE WHEN v_merge_queued THEN v_images END);
+END;
+$$;
@@ -0,0 +1,33 @@
+-- Approve many checks in one statement
+-- Used by POST /api/checks/bulk-approve
+-- Same split as approve_check: checks with pages are approved with merge_queued_at set and
+-- validated_at left NULL - the app merges their PDFs in the background and finish_approval_merge
+-- stamps validated_at. Checks without pages get validated_at (the Salesforce trigger) right away.
+-- Already-approved checks are skipped (re-stamping validated_at would re-fire Salesforce);
+-- only the rows actually approved are returned, with batch_images only where a merge is queued
+DROP FUNCTION IF EXISTS bulk_approve_checks(uuid[], text, jsonb);
+
+CREATE OR REPLACE FUNCTION bulk_approve_checks(
+    p_ids uuid[],
+    p_user text
+)
+RETURNS TABLE (
+    id checks.id%TYPE,
+    validated_at checks.validated_at%TYPE,
+    batch_images checks.batch_images%TYPE
+)
+LANGUAGE sql
+AS $$
+    UPDATE checks c
+    SET status = 'approved',
+        validated_at = CASE WHEN COALESCE(jsonb_array_length(c.batch_images), 0) > 0 THEN NULL ELSE now() END,
+        merge_queued_at = CASE WHEN COALESCE(jsonb_array_length(c.batch_images), 0) > 0 THEN now() END,
+        validated_by = p_user,
+        n8n_sync_enabled = true,
+        updated_at = now(),
+        reviewed_by = p_user,
+        reviewed_at = now()
+    WHERE c.id = ANY(p_ids)
+      AND c.status <> 'approved'
+    RETURNING c.id, c.validated_at, CASE WHEN c.merge_queued_at IS NOT NULL THEN c.batch_images END;
+$$;
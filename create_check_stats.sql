@@ -0,0 +1,27 @@
+-- Aggregate check statistics in one row instead of shipping every check to the API
+-- Used by GET /api/checks/stats
+CREATE OR REPLACE FUNCTION check_stats()
+RETURNS TABLE(
+    total bigint,
+    pending bigint,
+    approved bigint,
+    rejected bigint,
+    high_confidence bigint,
+    low_confidence bigint
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        count(*),
+        count(*) FILTER (WHERE status = 'pending'),
+        count(*) FILTER (WHERE status = 'approved'),
+        count(*) FILTER (WHERE status = 'rejected'),
+        count(*) FILTER (WHERE COALESCE(confidence_score, 0) > 0.8),
+        count(*) FILTER (WHERE COALESCE(confidence_score, 0) < 0.7)
+    FROM checks;
+$$;
+
+-- Narrow covering index so check_stats() can be answered by an index-only scan
+-- instead of reading every heap row (batch_images / image_data make rows wide)
+CREATE INDEX IF NOT EXISTS checks_status_confidence_idx ON checks (status) INCLUDE (confidence_score);
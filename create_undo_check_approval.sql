@@ -0,0 +1,42 @@
+-- Re-open an approved check by duplicating it server-side with status needs_review
+-- Used by POST /api/checks/undo-approval/<check_id>
+-- The original approved row is left untouched; the row never leaves the database
+-- The duplicate points at the original's split parent (or the original itself) so splitting it
+-- keeps numbering from the same split_counter instead of reusing an existing file name
+CREATE OR REPLACE FUNCTION undo_check_approval(p_check_id uuid)
+RETURNS json
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_status text;
+    v_duplicate_id uuid;
+BEGIN
+    SELECT status INTO v_status FROM checks WHERE id = p_check_id;
+
+    -- Caller maps a NULL status to 404 and anything but 'approved' to 400
+    IF v_status IS DISTINCT FROM 'approved' THEN
+        RETURN json_build_object('status', v_status, 'duplicate_check_id', NULL);
+    END IF;
+
+    INSERT INTO checks (
+        file_name, batch_id, batch_id_fk, provider_name, insurance_company, claim_number,
+        policy_number, amount, check_number, check_issue_date, pay_to, routing_number,
+        account_number, memo, matter_name, matter_id, matter_url, case_type, delivery_service,
+        tracking_number, claimant, insured_name, confidence_score, flags, batch_images,
+        page_count, check_type, image_data, image_mime_type, merged_pdf_url, parent_check_id,
+        status, created_at, updated_at, n8n_sync_enabled
+    )
+    SELECT
+        file_name, batch_id, batch_id_fk, provider_name, insurance_company, claim_number,
+        policy_number, amount, check_number, check_issue_date, pay_to, routing_number,
+        account_number, memo, matter_name, matter_id, matter_url, case_type, delivery_service,
+        tracking_number, claimant, insured_name, confidence_score, flags, batch_images,
+        page_count, check_type, image_data, image_mime_type, merged_pdf_url, COALESCE(parent_check_id, id),
+        'needs_review', now(), now(), false  -- Don't sync the duplicate to N8N
+    FROM checks
+    WHERE id = p_check_id
+    RETURNING id INTO v_duplicate_id;
+
+    RETURN json_build_object('status', v_status, 'duplicate_check_id', v_duplicate_id);
+END;
+$$;
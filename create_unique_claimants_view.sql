@@ -0,0 +1,10 @@
+-- Distinct, trimmed claimant names for the claimant fallback list
+-- Used by GET /api/claimants/list
+-- A plain view rather than a materialized one: the DISTINCT runs in Postgres either way,
+-- and the list is always current without a refresh schedule
+CREATE OR REPLACE VIEW unique_claimants AS
+SELECT DISTINCT trim(claimant) AS name
+  FROM checks
+ WHERE claimant IS NOT NULL
+   AND lower(trim(claimant)) NOT IN ('none', 'null', '')
+ ORDER BY 1 COLLATE "C";
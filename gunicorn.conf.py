@@ -0,0 +1,17 @@
+# gunicorn.conf.py
+"""
+gunicorn settings for the check validation app (see wsgi.py).
+Every endpoint is I/O bound on Supabase / Graph, so gevent workers each
+multiplex many requests instead of holding one request per process - one
+worker per CPU is enough. The CPU-bound MuPDF work runs in each worker's
+utils.pdf_worker pool, which shares the CPUs out across these workers.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = "gevent"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_connections = 1000
+timeout = 120
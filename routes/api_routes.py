@@ -10,14 +10,33 @@ Last Updated: September 2025
 =============================================================================
 """
 
-from flask import Blueprint, request, jsonify, session
-from utils.decorators import login_required
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context, url_for
+from utils.decorators import login_required, coalesce_requests
 from utils.logger import get_api_logger
+from utils.json_provider import orjson_response, orjson_bytes
+from utils.pdf_worker import find_separator_pages, merge_pdf_documents, run_pdf_job
 from services.supabase_service import supabase_service
-from datetime import datetime
+from datetime import datetime, timezone
+import contextlib
 import io
-from PyPDF2 import PdfMerger
+import json
+import logging
+import multiprocessing
+import os
+import re
+import tarfile
+import tempfile
+import threading
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, Future
+import fitz
+import orjson
+import pybase64
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # =============================================================================
 # CONFIGURATION & SETUP
@@ -26,6 +45,74 @@ import requests
 api_logger = get_api_logger()
 api_bp = Blueprint("api", __name__)
 
+# Storage bucket for check PDFs - handle and public URL prefix resolved once
+# (client is None when Supabase credentials are missing)
+CHECK_DOCUMENTS_BUCKET = 'check-documents'
+check_documents = supabase_service.client.storage.from_(CHECK_DOCUMENTS_BUCKET) if supabase_service.client else None
+CHECK_DOCUMENTS_PUBLIC_PREFIX = check_documents.get_public_url('_').rsplit('/', 1)[0] + '/' if check_documents else ''
+
+# Concurrent split-PDF downloads per merge - under gevent workers these threads are greenlets,
+# so a wide fan-out costs little and every page of a typical check downloads at once
+MERGE_DOWNLOAD_WORKERS = int(os.getenv('MERGE_DOWNLOAD_WORKERS', '20'))
+
+# Map form fields to database fields - Aligned with actual schema
+FIELD_MAPPING = {
+    'pay_to': 'pay_to',
+    'amount': 'amount',
+    'check_number': 'check_number',
+    'check_type': 'check_type',
+    'routing_number': 'routing_number',
+    'account_number': 'account_number',
+    'matter_name': 'matter_name',
+    'case_type': 'case_type',
+    'delivery_service': 'delivery_service',
+    'tracking_number': 'tracking_number',
+    'memo': 'memo',
+    'policy_number': 'policy_number',
+    'claim_number': 'claim_number',
+    'insurance_company': 'insurance_company',
+    'insurance_id': 'insurance_id',
+    'matter_id': 'matter_id',
+    'check_issue_date': 'check_issue_date',
+    'provider_name': 'provider_name',
+    'claimant': 'claimant',
+    'insured_name': 'insured_name',
+    'reference_number': 'reference_number',
+    'date_of_loss': 'date_of_loss',
+    'bank_name': 'bank_name',
+    'extraction_notes': 'extraction_notes'
+}
+
+# Approval also accepts the Salesforce insurance fields (from right side box)
+APPROVE_FIELD_MAPPING = {
+    **FIELD_MAPPING,
+    'sf_claim_number': 'claim_number',  # Maps to same DB field as provider claim_number
+    'sf_policy_number': 'policy_number'  # Maps to same DB field as provider policy_number
+}
+
+# Form fields stored as numbers rather than stripped strings
+FLOAT_FIELDS = frozenset({'amount'})
+
+# Check type selection on approval: the other side's fields are cleared
+PROVIDER_FIELDS = frozenset({'provider_name', 'claim_number', 'policy_number'})
+INSURANCE_FIELDS = frozenset({'insurance_company', 'insurance_id', 'sf_claim_number', 'sf_policy_number'})
+
+# Shared checks select lists (no blobs) - one place to add/remove columns
+# CHECK_LIST_COLUMNS: batch check lists, CHECK_DETAIL_COLUMNS: single-check reads and ?fields= whitelist
+CHECK_LIST_COLUMNS = 'id,file_name,batch_id,batch_id_fk,provider_name,insurance_company,claim_number,policy_number,amount,check_number,check_issue_date,pay_to,routing_number,account_number,memo,matter_name,matter_id,matter_url,case_type,delivery_service,tracking_number,claimant,insured_name,status,confidence_score,flags,validated_at,validated_by,reviewed_at,reviewed_by,created_at,updated_at,page_count'
+CHECK_DETAIL_COLUMNS = CHECK_LIST_COLUMNS + ',check_type,n8n_sync_enabled'
+CHECK_SPLIT_COLUMNS = CHECK_DETAIL_COLUMNS + ',parent_check_id'
+CHECK_WITH_PAGES_COLUMNS = CHECK_DETAIL_COLUMNS + ',check_pages(*)'
+ALLOWED_CHECK_FIELDS = frozenset(CHECK_DETAIL_COLUMNS.split(',')) | {'merged_pdf_url', 'parent_check_id'}
+
+# Flag-for-review form: form-only / server-owned keys that are never written, and date
+# fields where an empty string means NULL
+NEEDS_REVIEW_SKIP_FIELDS = frozenset({'status', 'updated_at', 'reason', 'check_type_selection', 'sf_claim_number', 'sf_policy_number'})
+DATE_FIELDS = frozenset({'check_issue_date', 'date_of_loss'})
+
+# Currency symbols, thousands separators and whitespace stripped before float()
+_AMOUNT_RE = re.compile(r'[$,\s]')
+
 
 #░█▀█░█▀▄░█▀▀░░░█▄█░█▀▀░█▀▄░█▀▀░█▀▀░█▀▄░░░█░█░█▀▀░█░░░█▀█░█▀▀░█▀▄
 #░█▀▀░█░█░█▀▀░░░█░█░█▀▀░█▀▄░█░█░█▀▀░█▀▄░░░█▀█░█▀▀░█░░░█▀▀░█▀▀░█▀▄
@@ -41,65 +128,63 @@ def merge_batch_pdfs_and_upload(check_id, batch_images):
     """
     try:
         if not batch_images or len(batch_images) == 0:
-            api_logger.warning(f"⚠️ No batch images to merge for check {check_id}")
+            api_logger.warning("⚠️ No batch images to merge for check %s", check_id)
             return None
         
-        api_logger.info(f"🔄 MERGE FUNCTION CALLED: Merging {len(batch_images)} PDFs for check {check_id}")
+        api_logger.info("🔄 MERGE FUNCTION CALLED: Merging %s PDFs for check %s", len(batch_images), check_id)
         
         # If there's only 1 PDF, just copy it as the "merged" PDF
         if len(batch_images) == 1:
-            api_logger.info(f"📄 Only 1 PDF found - will copy it as merged PDF")
+            api_logger.info("📄 Only 1 PDF found - will copy it as merged PDF")
             pdf_url = batch_images[0].get('url') or batch_images[0].get('primary_url') or batch_images[0].get('download_url')
             
             if pdf_url:
-                api_logger.info(f"✅ Single PDF URL will be used as merged_pdf_url: {pdf_url}")
+                api_logger.info("✅ Single PDF URL will be used as merged_pdf_url: %s", pdf_url)
                 return pdf_url
             else:
-                api_logger.error(f"❌ No URL found in single batch image: {batch_images[0]}")
+                api_logger.error("❌ No URL found in single batch image: %s", batch_images[0])
                 return None
         
-        api_logger.info(f"🔄 Multiple PDFs detected - proceeding with merge operation")
-        
-        # Create PDF merger
-        merger = PdfMerger()
+        api_logger.info("🔄 Multiple PDFs detected - proceeding with merge operation")
         
-        # Download and add each PDF to the merger
-        for idx, img_info in enumerate(batch_images):
+        def download_batch_image(idx, img_info):
+            """Fetch one split PDF from Supabase Storage - None when it can't be downloaded"""
             pdf_url = img_info.get('url') or img_info.get('primary_url') or img_info.get('download_url')
             
             if not pdf_url:
-                api_logger.warning(f"No URL found for batch image {idx} in check {check_id}")
-                continue
+                api_logger.warning("No URL found for batch image %s in check %s", idx, check_id)
+                return None
             
             try:
                 # Download PDF from Supabase Storage
                 if '/check-documents/' in pdf_url:
                     storage_path = pdf_url.split('/check-documents/')[1]
                 else:
-                    api_logger.warning(f"Invalid PDF URL format for check {check_id}, image {idx}: {pdf_url}")
-                    continue
+                    api_logger.warning("Invalid PDF URL format for check %s, image %s: %s", check_id, idx, pdf_url)
+                    return None
                 
-                api_logger.info(f"  Downloading PDF {idx + 1}/{len(batch_images)}: {storage_path}")
-                pdf_data = supabase_service.client.storage.from_('check-documents').download(storage_path)
+                api_logger.info("  Downloading PDF %s/%s: %s", idx + 1, len(batch_images), storage_path)
+                pdf_data = check_documents.download(storage_path)
                 
                 if not pdf_data:
-                    api_logger.warning(f"No data returned for {storage_path}")
-                    continue
-                
-                # Add to merger
-                pdf_stream = io.BytesIO(pdf_data)
-                merger.append(pdf_stream)
-                api_logger.info(f"  ✅ Added PDF {idx + 1} to merger")
+                    api_logger.warning("No data returned for %s", storage_path)
+                    return None
+                return pdf_data
                 
             except Exception as e:
-                api_logger.error(f"Error downloading/merging PDF {idx} for check {check_id}: {str(e)}")
-                continue
+                api_logger.error("Error downloading PDF %s for check %s: %s", idx, check_id, e)
+                return None
+        
+        # Download every PDF concurrently - map() hands results back in batch_images order
+        with ThreadPoolExecutor(max_workers=min(MERGE_DOWNLOAD_WORKERS, len(batch_images))) as executor:
+            downloads = list(executor.map(download_batch_image, range(len(batch_images)), batch_images))
         
-        # Write merged PDF to bytes
-        merged_pdf_bytes = io.BytesIO()
-        merger.write(merged_pdf_bytes)
-        merger.close()
-        merged_pdf_bytes.seek(0)
+        # Append in original order in a PDF worker process - MuPDF's xref copy is CPU bound
+        # and would otherwise block every other request on this gevent worker
+        merged_pdf_bytes, unreadable = run_pdf_job(merge_pdf_documents, downloads)
+        for idx in unreadable:
+            api_logger.error("Error merging PDF %s for check %s: MuPDF could not read it", idx, check_id)
+        api_logger.info("  ✅ Merged %s PDFs", sum(pdf is not None for pdf in downloads) - len(unreadable))
         
         # Generate filename for merged PDF
         merged_filename = f"merged_{check_id}.pdf"
@@ -114,31 +199,178 @@ def merge_batch_pdfs_and_upload(check_id, batch_images):
             # Fallback to root if we can't determine batch folder
             storage_path = merged_filename
         
-        api_logger.info(f"📤 Uploading merged PDF to: {storage_path}")
+        api_logger.info("📤 Uploading merged PDF to: %s", storage_path)
         
         # Upload to Supabase Storage
-        upload_response = supabase_service.client.storage.from_('check-documents').upload(
+        upload_response = check_documents.upload(
             storage_path,
-            merged_pdf_bytes.getvalue(),
+            merged_pdf_bytes,
             file_options={"content-type": "application/pdf", "upsert": "true"}
         )
         
-        # Get public URL
-        merged_url = supabase_service.client.storage.from_('check-documents').get_public_url(storage_path)
+        # Public URL is the cached bucket prefix plus the object path
+        merged_url = CHECK_DOCUMENTS_PUBLIC_PREFIX + storage_path
         
-        api_logger.info(f"✅ Merged PDF uploaded successfully: {merged_url}")
+        api_logger.info("✅ Merged PDF uploaded successfully: %s", merged_url)
         return merged_url
         
     except Exception as e:
-        api_logger.error(f"Error merging PDFs for check {check_id}: {str(e)}")
-        import traceback
-        api_logger.error(f"Full traceback:\n{traceback.format_exc()}")
+        api_logger.error("Error merging PDFs for check %s: %s", check_id, e)
+        api_logger.error("Full traceback:\n%s", traceback.format_exc())
         return None
 
+# Background PDF merges for approvals - the downloads/upload are I/O here, the merge itself runs in a PDF worker process
+merge_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="approval-merge")
+
+# A deferred approval (merge_queued_at set, see add_merge_queued_at.sql) still without validated_at
+# this long after it was queued lost its merge (worker restart, failed final update) - the sweeper re-runs it
+APPROVAL_MERGE_STALE_SECONDS = int(os.getenv('APPROVAL_MERGE_STALE_SECONDS', 600))
+APPROVAL_SWEEP_INTERVAL_SECONDS = int(os.getenv('APPROVAL_SWEEP_INTERVAL_SECONDS', 300))
+
+def approval_trigger_data():
+    """Fields that fire Jai's edge function - written only once the merged PDF exists"""
+    return {
+        'validated_at': utc_now_iso(),  # ← THIS triggers Jai's edge function (ONLY trigger)
+        'n8n_sync_enabled': True  # N8N workflow trigger
+    }
+
+def finish_approval_merge(check_id, batch_images, trigger_data):
+    """
+    Background half of approve_check: merge the pages, then save merged_pdf_url together
+    with validated_at so Jai's edge function only fires once the merged PDF exists.
+    A failed merge still completes the approval without merged_pdf_url.
+    If this never completes the row keeps merge_queued_at with validated_at NULL, which
+    requeue_stale_approvals (and a repeated approve) picks up again.
+    """
+    try:
+        merged_pdf_url = merge_batch_pdfs_and_upload(check_id, batch_images)
+        
+        final_update = dict(trigger_data, merge_queued_at=None)
+        if merged_pdf_url:
+            api_logger.info("✅ Merged PDF URL generated: %s", merged_pdf_url)
+            final_update['merged_pdf_url'] = merged_pdf_url
+        else:
+            api_logger.warning("⚠️ PDF merge RETURNED NULL for check %s - continuing with approval", check_id)
+        
+        # Only a still-pending deferred approval: a duplicate requeue (or a second approve) finds
+        # validated_at set / merge_queued_at cleared and writes nothing, so Salesforce fires once.
+        # Undo leaves the original row approved, so it does not cancel a merge that's already running
+        supabase_service.client.table('checks').update(final_update)\
+            .eq('id', check_id)\
+            .eq('status', 'approved')\
+            .is_('validated_at', 'null')\
+            .not_.is_('merge_queued_at', 'null')\
+            .execute()
+        api_logger.info("Check %s merge finished - triggering Salesforce protocol", check_id)
+        
+    except Exception as e:
+        api_logger.error("Error finishing approval merge for check %s: %s", check_id, e)
+        api_logger.error(traceback.format_exc())
+
+def requeue_stale_approvals():
+    """
+    Re-queue deferred approvals whose background merge never finished (merge_queued_at older
+    than APPROVAL_MERGE_STALE_SECONDS, validated_at still NULL). Each row is claimed with a
+    conditional merge_queued_at bump first, so only one gunicorn worker re-runs a given merge.
+    """
+    cutoff = datetime.fromtimestamp(time.time() - APPROVAL_MERGE_STALE_SECONDS, timezone.utc).isoformat(timespec='milliseconds')
+    stale = supabase_service.client.table('checks')\
+        .select('id, batch_images')\
+        .eq('status', 'approved')\
+        .is_('validated_at', 'null')\
+        .lt('merge_queued_at', cutoff)\
+        .limit(50)\
+        .execute()
+    
+    requeued = 0
+    for check in stale.data or []:
+        claim = supabase_service.client.table('checks')\
+            .update({'merge_queued_at': utc_now_iso()}, count='exact', returning='minimal')\
+            .eq('id', check['id'])\
+            .is_('validated_at', 'null')\
+            .lt('merge_queued_at', cutoff)\
+            .execute()
+        if claim.count:
+            merge_executor.submit(finish_approval_merge, check['id'], check.get('batch_images'), approval_trigger_data())
+            requeued += 1
+    
+    if requeued:
+        api_logger.warning("⚠️ Re-queued %s approvals whose PDF merge never finished", requeued)
+    return requeued
+
+def _approval_sweeper_loop():
+    """Run requeue_stale_approvals forever - one failed sweep just waits for the next"""
+    while True:
+        time.sleep(APPROVAL_SWEEP_INTERVAL_SECONDS)
+        try:
+            requeue_stale_approvals()
+        except Exception as e:
+            api_logger.error("Error sweeping stale approvals: %s", e)
+
+def start_approval_sweeper():
+    """Start the stale-approval sweeper (a greenlet under gevent workers)"""
+    if multiprocessing.parent_process() is not None:
+        return  # a PDF pool worker re-importing __main__ - not a web process
+    threading.Thread(target=_approval_sweeper_loop, name="approval-sweeper", daemon=True).start()
+
 # =============================================================================
 # CHECK VALIDATION API ENDPOINTS
 # =============================================================================
 
+def utc_now_iso():
+    """Timezone-aware UTC timestamp for Supabase columns, millisecond precision"""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+def _build_update_payload(data, selection=None, include_sf_fields=False):
+    """
+    Build a checks update dict from submitted form values (shared by save and approve).
+    Amounts are parsed to float, text is stripped.
+    selection ('provider' / 'insurance') writes the other side's fields as NULL;
+    include_sf_fields adds the Salesforce claim/policy numbers sent on approval.
+    """
+    # 🔥 CHECK TYPE SELECTION - Use provider OR insurance data, not both!
+    cleared_fields = frozenset()
+    if selection == 'insurance':
+        cleared_fields = PROVIDER_FIELDS
+    elif selection == 'provider':
+        cleared_fields = INSURANCE_FIELDS
+    if cleared_fields:
+        api_logger.info("Clearing fields %s because %s was selected", sorted(cleared_fields), selection)
+
+    field_mapping = APPROVE_FIELD_MAPPING if include_sf_fields else FIELD_MAPPING
+    update_data = {}
+    for form_field, db_field in field_mapping.items():
+        value = data.get(form_field)
+        if value is None:
+            continue
+        
+        if form_field in cleared_fields:
+            update_data[db_field] = None
+            continue
+        
+        # Handle amount conversion
+        if form_field in FLOAT_FIELDS:
+            # Fast paths: blank amounts and amounts the client already sent as numbers
+            if not value:
+                update_data[db_field] = 0.0
+                continue
+            if isinstance(value, (int, float)):
+                update_data[db_field] = float(value)
+                continue
+            try:
+                # Remove currency symbols and convert to float
+                value = _AMOUNT_RE.sub('', value) if isinstance(value, str) else value
+                update_data[db_field] = float(value) if value else 0.0
+            except (ValueError, TypeError):
+                update_data[db_field] = 0.0
+        elif isinstance(value, str):
+            update_data[db_field] = value.strip() if value else None
+        else:
+            # Numbers/bools go through as-is - PostgREST serializes them
+            update_data[db_field] = value if value else None
+    
+    return update_data
+
 #░█▀▀░█▀█░█░█░█▀▀░░░█▀▀░█░█░█▀▀░█▀▀░█░█
 #░▀▀█░█▀█░▀▄▀░█▀▀░░░█░░░█▀█░█▀▀░█░░░█▀▄
 #░▀▀▀░▀░▀░░▀░░▀▀▀░░░▀▀▀░▀░▀░▀▀▀░▀▀▀░▀░▀
@@ -158,77 +390,50 @@ def save_check(check_id):
             return jsonify({"status": "error", "message": "No data provided"}), 400
 
         # Prepare update data - only include fields that exist in schema
-        update_data = {}
-
-        # Map form fields to database fields - Aligned with actual schema
-        field_mapping = {
-            'pay_to': 'pay_to',
-            'amount': 'amount',
-            'check_number': 'check_number',
-            'check_type': 'check_type',
-            'routing_number': 'routing_number',
-            'account_number': 'account_number',
-            'matter_name': 'matter_name',
-            'case_type': 'case_type',
-            'delivery_service': 'delivery_service',
-            'tracking_number': 'tracking_number',
-            'memo': 'memo',
-            'policy_number': 'policy_number',
-            'claim_number': 'claim_number',
-            'insurance_company': 'insurance_company',
-            'insurance_id': 'insurance_id',
-            'matter_id': 'matter_id',
-            'check_issue_date': 'check_issue_date',
-            'provider_name': 'provider_name',
-            'claimant': 'claimant',
-            'insured_name': 'insured_name',
-            'reference_number': 'reference_number',
-            'date_of_loss': 'date_of_loss',
-            'bank_name': 'bank_name',
-            'extraction_notes': 'extraction_notes'
-        }
-        
-        # Process each field from the form
-        for form_field, db_field in field_mapping.items():
-            if form_field in data and data[form_field] is not None:
-                value = data[form_field]
-                
-                # Handle amount conversion
-                if form_field == 'amount':
-                    try:
-                        # Remove currency symbols and convert to float
-                        if isinstance(value, str):
-                            value = value.replace('$', '').replace(',', '').strip()
-                        update_data[db_field] = float(value) if value else 0.0
-                    except (ValueError, TypeError):
-                        update_data[db_field] = 0.0
-                else:
-                    update_data[db_field] = str(value).strip() if value else None
+        update_data = _build_update_payload(data)
+        now_iso = utc_now_iso()
+        
+        # Nothing but metadata would change - skip the write (autosave on an untouched form),
+        # but still confirm the check exists and report what's actually stored
+        if not update_data:
+            existing = supabase_service.client.table('checks').select('updated_at,reviewed_by').eq('id', check_id).limit(1).execute()
+            if not existing.data:
+                return jsonify({"status": "error", "message": "Check not found"}), 404
+            return jsonify({
+                "status": "success",
+                "message": "No changes to save",
+                "updated_at": existing.data[0].get('updated_at'),
+                "reviewed_by": existing.data[0].get('reviewed_by')
+            })
         
         # Add metadata (but NOT validated_at - that's only for approval)
         update_data.update({
-            'updated_at': datetime.utcnow().isoformat(),
+            'updated_at': now_iso,
             'reviewed_by': user.get('preferred_username', 'unknown'),
-            'reviewed_at': datetime.utcnow().isoformat()
+            'reviewed_at': now_iso
         })
         
-        # Update in Supabase
-        response = supabase_service.client.table('checks').update(update_data).eq('id', check_id).execute()
+        # Update in Supabase - return=minimal skips sending the row back, count tells us it matched
+        response = supabase_service.client.table('checks')\
+            .update(update_data, count='exact', returning='minimal')\
+            .eq('id', check_id)\
+            .execute()
         
-        if response.data and len(response.data) > 0:
-            api_logger.info(f"Check {check_id} saved by {user.get('preferred_username')}")
+        if response.count:
+            api_logger.info("Check %s saved by %s", check_id, user.get('preferred_username'))
             return jsonify({
                 "status": "success", 
                 "message": "Check saved successfully",
-                "updated_at": response.data[0].get('updated_at'),
-                "reviewed_by": response.data[0].get('reviewed_by')
+                "updated_at": update_data['updated_at'],
+                "reviewed_by": update_data['reviewed_by']
             })
         else:
-            api_logger.error(f"No data returned when saving check {check_id}")
-            return jsonify({"status": "error", "message": "Failed to save check - no data returned"}), 500
+            # The update matched no row - the id doesn't exist
+            api_logger.error("No check %s to save", check_id)
+            return jsonify({"status": "error", "message": "Check not found"}), 404
             
     except Exception as e:
-        api_logger.error(f"Error saving check {check_id}: {str(e)}")
+        api_logger.error("Error saving check %s: %s", check_id, e)
         return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
 
 #░█▀█░█▀█░█▀█░█▀▄░█▀█░█░█░█▀▀░░░█▀▀░█░█░█▀▀░█▀▀░█░█
@@ -237,6 +442,7 @@ def save_check(check_id):
 
 @api_bp.route("/api/checks/approve/<check_id>", methods=["POST"])
 @login_required
+@coalesce_requests('approve')
 def approve_check(check_id):
     """
     Approve check and trigger Salesforce protocol
@@ -249,143 +455,145 @@ def approve_check(check_id):
         if not data:
             return jsonify({"status": "error", "message": "No data provided"}), 400
 
-        # Prepare update data with all current form values
-        update_data = {}
-        
-        # 🔥 CHECK TYPE SELECTION - Use provider OR insurance data, not both!
         check_type_selection = data.get('check_type_selection', '').strip()
-        api_logger.info(f"Check type selection: '{check_type_selection}'")
-
-        # Map form fields to database fields - Aligned with actual schema
-        field_mapping = {
-            'pay_to': 'pay_to',
-            'amount': 'amount',
-            'check_number': 'check_number',
-            'check_type': 'check_type',
-            'routing_number': 'routing_number',
-            'account_number': 'account_number',
-            'matter_name': 'matter_name',
-            'case_type': 'case_type',
-            'delivery_service': 'delivery_service',
-            'tracking_number': 'tracking_number',
-            'memo': 'memo',
-            'policy_number': 'policy_number',
-            'claim_number': 'claim_number',
-            'insurance_company': 'insurance_company',
-            'insurance_id': 'insurance_id',
-            'matter_id': 'matter_id',
-            'check_issue_date': 'check_issue_date',
-            'provider_name': 'provider_name',
-            'claimant': 'claimant',
-            'insured_name': 'insured_name',
-            'reference_number': 'reference_number',
-            'date_of_loss': 'date_of_loss',
-            'bank_name': 'bank_name',
-            'extraction_notes': 'extraction_notes',
-            # 🔥 SALESFORCE INSURANCE FIELDS (from right side box)
-            'sf_claim_number': 'claim_number',  # Maps to same DB field as provider claim_number
-            'sf_policy_number': 'policy_number'  # Maps to same DB field as provider policy_number
-        }
+        api_logger.info("Check type selection: '%s'", check_type_selection)
         
-        # Process form fields
-        for form_field, db_field in field_mapping.items():
-            if form_field in data and data[form_field] is not None:
-                value = data[form_field]
-                
-                # 🔥 SKIP PROVIDER FIELDS if insurance was selected
-                if check_type_selection == 'insurance':
-                    if form_field in ['provider_name', 'claim_number', 'policy_number']:
-                        api_logger.info(f"Skipping provider field '{form_field}' because insurance was selected")
-                        update_data[db_field] = None  # Clear provider data
-                        continue
-                
-                # 🔥 SKIP SALESFORCE INSURANCE FIELDS if provider was selected
-                if check_type_selection == 'provider':
-                    if form_field in ['insurance_company', 'insurance_id', 'sf_claim_number', 'sf_policy_number']:
-                        api_logger.info(f"Skipping insurance field '{form_field}' because provider was selected")
-                        update_data[db_field] = None  # Clear insurance data
-                        continue
-                
-                # Handle amount conversion
-                if form_field == 'amount':
-                    try:
-                        if isinstance(value, str):
-                            value = value.replace('$', '').replace(',', '').strip()
-                        update_data[db_field] = float(value) if value else 0.0
-                    except (ValueError, TypeError):
-                        update_data[db_field] = 0.0
-                else:
-                    update_data[db_field] = str(value).strip() if value else None
-        
-        # 🔥 MERGE PDFs FOR SALESFORCE - Jai's function needs merged_pdf_url, not batch_images
-        # Get current check to access batch_images
-        api_logger.info(f"🔍 STARTING PDF MERGE PROCESS for check {check_id}")
-        check_response = supabase_service.client.table('checks').select('batch_images').eq('id', check_id).single().execute()
-        
-        api_logger.info(f"🔍 check_response.data: {check_response.data}")
-        
-        if check_response.data and check_response.data.get('batch_images'):
-            batch_images = check_response.data.get('batch_images')
-            api_logger.info(f"📋 Found {len(batch_images)} images to merge for check {check_id}")
-            api_logger.info(f"📋 batch_images content: {batch_images}")
-            
-            # Merge PDFs and upload
-            api_logger.info(f"🔄 CALLING merge_batch_pdfs_and_upload()...")
-            merged_pdf_url = merge_batch_pdfs_and_upload(check_id, batch_images)
-            api_logger.info(f"🔄 merge_batch_pdfs_and_upload() RETURNED: {merged_pdf_url}")
-            
-            if merged_pdf_url:
-                api_logger.info(f"✅ Merged PDF URL generated: {merged_pdf_url}")
-                update_data['merged_pdf_url'] = merged_pdf_url
-                api_logger.info(f"🔧 Added merged_pdf_url to update_data. Will be saved to database.")
-                api_logger.info(f"🔧 Current update_data keys: {list(update_data.keys())}")
-            else:
-                api_logger.warning(f"⚠️ PDF merge RETURNED NULL for check {check_id} - continuing with approval")
-                api_logger.warning(f"⚠️ merged_pdf_url will NOT be set in database")
-        else:
-            api_logger.warning(f"⚠️ No batch_images found for check {check_id} - skipping PDF merge")
-            api_logger.warning(f"⚠️ check_response.data: {check_response.data}")
-            api_logger.warning(f"⚠️ merged_pdf_url will NOT be set in database")
+        # Prepare update data with all current form values
+        # 🔥 CLEARS PROVIDER FIELDS if insurance was selected, SALESFORCE INSURANCE FIELDS if provider was selected
+        update_data = _build_update_payload(data, selection=check_type_selection, include_sf_fields=True)
         
-        # Add approval metadata - THIS TRIGGERS THE EDGE FUNCTION
-        approval_timestamp = datetime.utcnow().isoformat()
+        # Add approval metadata
+        approval_timestamp = utc_now_iso()
         update_data.update({
             'status': 'approved',
-            'validated_at': approval_timestamp,  # ← THIS triggers Jai's edge function (ONLY trigger)
             'validated_by': user.get('preferred_username', 'unknown'),  # ← Capture approving user
-            'n8n_sync_enabled': True,  # N8N workflow trigger 
             'updated_at': approval_timestamp,
             'reviewed_by': user.get('preferred_username', 'unknown'),
             'reviewed_at': approval_timestamp
         })
-
-        
         
-        # Update in Supabase
-        api_logger.info(f"📝 Updating check {check_id} with {len(update_data)} fields")
-        api_logger.info(f"📝 merged_pdf_url in update_data: {'merged_pdf_url' in update_data}")
+        # THESE TRIGGER THE EDGE FUNCTION - held back until the merged PDF exists
+        trigger_data = approval_trigger_data()
         
-        response = supabase_service.client.table('checks').update(update_data).eq('id', check_id).execute()
+        # 🔥 MERGE PDFs FOR SALESFORCE - Jai's function needs merged_pdf_url, not batch_images
+        # One round trip (see create_approve_check.sql): the row is locked and updated, and its batch_images
+        # come back from the database - never from the request body. With pages the function sets
+        # merge_queued_at and leaves trigger_data to finish_approval_merge; without pages it writes trigger_data now.
+        # An already-approved check is left alone so a repeated approve doesn't re-merge or re-trigger Salesforce
+        api_logger.info("📝 Approving check %s with %s fields", check_id, len(update_data))
+        result = supabase_service.client.rpc('approve_check', {
+            'p_check_id': check_id,
+            'p_update': update_data,
+            'p_trigger': trigger_data
+        }).execute().data or {}
+        
+        if not result.get('found'):
+            return jsonify({"status": "error", "message": "Check not found"}), 404
         
-        if response.data and len(response.data) > 0:
-            saved_merged_url = response.data[0].get('merged_pdf_url')
-            api_logger.info(f"Check {check_id} APPROVED by {user.get('preferred_username')} - triggering Salesforce protocol")
-            api_logger.info(f"✅ merged_pdf_url SAVED to database: {saved_merged_url if saved_merged_url else 'NOT SET'}")
+        if result.get('approved'):
+            batch_images = result.get('batch_images')
+            if batch_images:
+                merge_executor.submit(finish_approval_merge, check_id, batch_images, trigger_data)
+                api_logger.info("Check %s APPROVED by %s - Salesforce protocol queued behind merge of %d PDFs",
+                                check_id, user.get('preferred_username'), len(batch_images))
+            else:
+                api_logger.warning("⚠️ No batch_images found for check %s - merged_pdf_url will NOT be set", check_id)
+                api_logger.info("Check %s APPROVED by %s - triggering Salesforce protocol", check_id, user.get('preferred_username'))
             
+            # validated_at is reported now even when the merge is still running - it's the value the merge will write
             return jsonify({
                 "status": "success", 
                 "message": "Check approved successfully - Salesforce protocol initiated",
-                "validated_at": response.data[0].get('validated_at'),
-                "validated_by": response.data[0].get('validated_by'),
+                "validated_at": trigger_data['validated_at'],
+                "validated_by": update_data['validated_by'],
                 "validated_by_name": user.get('name', user.get('preferred_username', 'Unknown')),
-                "new_status": "approved"
-            })
-        else:
-            api_logger.error(f"No data returned when approving check {check_id}")
-            return jsonify({"status": "error", "message": "Failed to approve check - no data returned"}), 500
+                "new_status": "approved",
+                "merge_queued": bool(batch_images)
+            }), 202 if batch_images else 200
+        
+        if result.get('merge_queued_at') and not result.get('validated_at'):
+            # Deferred approval whose merge never saved validated_at (restart / failed update) - run it again.
+            # Older checks approved without validated_at have no marker and are left alone
+            merge_executor.submit(finish_approval_merge, check_id, result.get('batch_images'), trigger_data)
+            api_logger.warning("⚠️ Check %s approved without validated_at - re-queued PDF merge", check_id)
+            return jsonify({
+                "status": "success",
+                "message": "Check already approved - Salesforce protocol re-queued",
+                "validated_at": trigger_data['validated_at'],
+                "validated_by": result.get('validated_by'),
+                "new_status": "approved",
+                "merge_queued": True
+            }), 202
+        
+        api_logger.info("Check %s was already approved - nothing to do", check_id)
+        return jsonify({
+            "status": "success",
+            "message": "Check already approved",
+            "validated_at": result.get('validated_at'),
+            "validated_by": result.get('validated_by'),
+            "new_status": "approved",
+            "merge_queued": False
+        })
             
     except Exception as e:
-        api_logger.error(f"Error approving check {check_id}: {str(e)}")
+        api_logger.error("Error approving check %s: %s", check_id, e)
+        return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
+
+#░█▀▄░█░█░█░░░█░█░░░█▀█░█▀█░█▀█░█▀▄░█▀█░█░█░█▀▀
+#░█▀▄░█░█░█░░░█▀▄░░░█▀█░█▀▀░█▀▀░█▀▄░█░█░▀▄▀░█▀▀
+#░▀▀░░▀▀▀░▀▀▀░▀░▀░░░▀░▀░▀░░░▀░░░▀░▀░▀▀▀░░▀░░▀▀▀
+
+@api_bp.route("/api/checks/bulk-approve", methods=["POST"])
+@login_required
+def bulk_approve_checks():
+    """
+    Approve several checks at once with their current saved values
+    Expects {"ids": [...]} - one write (bulk_approve_checks RPC), PDF merges run in the background
+    """
+    try:
+        user = session.get("user")
+        data = request.get_json()
+        check_ids = (data or {}).get('ids')
+        
+        if not isinstance(check_ids, list) or not all(isinstance(check_id, str) for check_id in check_ids):
+            return jsonify({"status": "error", "message": "ids must be a list of check ids"}), 400
+        if not check_ids:
+            return jsonify({"status": "error", "message": "No check ids provided"}), 400
+        
+        # Single UPDATE for every check not yet approved (see create_bulk_approve_checks.sql) - checks without
+        # pages get validated_at now, checks with pages come back with batch_images and merge_queued_at set
+        response = supabase_service.client.rpc('bulk_approve_checks', {
+            'p_ids': check_ids,
+            'p_user': user.get('preferred_username', 'unknown')
+        }).execute()
+        
+        approved = response.data or []
+        approved_ids = {c['id'] for c in approved}
+        
+        # 🔥 MERGE PDFs FOR SALESFORCE - same background path as a single approval
+        merges_queued = 0
+        for check in approved:
+            if check.get('batch_images'):
+                merge_executor.submit(finish_approval_merge, check['id'], check['batch_images'], approval_trigger_data())
+                merges_queued += 1
+        api_logger.info("%s checks APPROVED in bulk by %s - %s PDF merges queued",
+                        len(approved), user.get('preferred_username'), merges_queued)
+        
+        # validated_at is NULL for checks whose merge is still queued - it's written when the merge finishes
+        return jsonify({
+            "status": "success",
+            "message": f"{len(approved)} checks approved - Salesforce protocol initiated",
+            "approved": [
+                {"id": c['id'], "validated_at": c.get('validated_at'), "merge_queued": bool(c.get('batch_images'))}
+                for c in approved
+            ],
+            "skipped": [check_id for check_id in check_ids if check_id not in approved_ids],
+            "validated_by_name": user.get('name', user.get('preferred_username', 'Unknown')),
+            "new_status": "approved"
+        }), 202 if merges_queued else 200
+        
+    except Exception as e:
+        api_logger.error("Error bulk approving checks: %s", e)
         return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
 
 #░█░█░█▀█░█▀▄░█▀█░░░█▀█░█▀█░█▀█░█▀▄░█▀█░█░█░█▀█░█░░
@@ -404,45 +612,26 @@ def undo_approval(check_id):
         if not user:
             return jsonify({"status": "error", "message": "User not authenticated"}), 401
 
-        api_logger.info(f"Undoing approval for check {check_id} by {user.get('preferred_username')}")
+        api_logger.info("Undoing approval for check %s by %s", check_id, user.get('preferred_username'))
 
-        # Get the current check data (including merged_pdf_url so it carries over to duplicate)
-        current_check_response = supabase_service.client.table('checks')\
-            .select('id,file_name,batch_id,batch_id_fk,provider_name,insurance_company,claim_number,policy_number,amount,check_number,check_issue_date,pay_to,routing_number,account_number,memo,matter_name,matter_id,matter_url,case_type,delivery_service,tracking_number,claimant,insured_name,status,confidence_score,flags,validated_at,validated_by,reviewed_at,reviewed_by,created_at,updated_at,batch_images,page_count,check_type,n8n_sync_enabled,image_data,image_mime_type,merged_pdf_url')\
-            .eq('id', check_id)\
-            .single()\
-            .execute()
+        # Duplicate the approved check with status=needs_review in one round trip (see create_undo_check_approval.sql)
+        # merged_pdf_url, image_data and batch_images carry over server-side instead of through the app
+        undo_response = supabase_service.client.rpc('undo_check_approval', {'p_check_id': check_id}).execute()
+        result = undo_response.data or {}
 
-        if not current_check_response.data:
+        if result.get('status') is None:
             return jsonify({"status": "error", "message": "Check not found"}), 404
 
-        current_check = current_check_response.data
-
         # Verify the check is actually approved
-        if current_check.get('status') != 'approved':
+        if result.get('status') != 'approved':
             return jsonify({"status": "error", "message": "Check is not approved"}), 400
 
-        # Create a duplicate check with needs_review status
-        # Copy all fields except id, status, validated_at, validated_by
-        duplicate_data = {
-            key: value for key, value in current_check.items()
-            if key not in ['id', 'created_at', 'updated_at', 'validated_at', 'validated_by', 'reviewed_at', 'reviewed_by', 'n8n_sync_enabled']
-        }
-
-        # Set status to needs_review for the duplicate (not pending)
-        duplicate_data['status'] = 'needs_review'
-        duplicate_data['created_at'] = datetime.utcnow().isoformat()
-        duplicate_data['updated_at'] = datetime.utcnow().isoformat()
-        duplicate_data['n8n_sync_enabled'] = False  # Don't sync the duplicate to N8N
-
-        # Insert the duplicate into the checks table
-        duplicate_response = supabase_service.client.table('checks').insert(duplicate_data).execute()
-
-        if not duplicate_response.data:
-            api_logger.error(f"Failed to create duplicate check for {check_id}")
+        duplicate_check_id = result.get('duplicate_check_id')
+        if not duplicate_check_id:
+            api_logger.error("Failed to create duplicate check for %s", check_id)
             return jsonify({"status": "error", "message": "Failed to create duplicate check"}), 500
 
-        api_logger.info(f"Created duplicate check {duplicate_response.data[0]['id']} from approved check {check_id} with status=needs_review")
+        api_logger.info("Created duplicate check %s from approved check %s with status=needs_review", duplicate_check_id, check_id)
 
         # Note: We do NOT modify the original approved record
         # It stays in the approved table with its validated_at timestamp intact
@@ -450,16 +639,31 @@ def undo_approval(check_id):
         return jsonify({
             "status": "success",
             "message": "Approval undone successfully",
-            "duplicate_check_id": duplicate_response.data[0]['id'],
+            "duplicate_check_id": duplicate_check_id,
             "new_status": "needs_review"
         })
 
     except Exception as e:
-        api_logger.error(f"Error undoing approval for check {check_id}: {str(e)}")
-        import traceback
+        api_logger.error("Error undoing approval for check %s: %s", check_id, e)
         api_logger.error(traceback.format_exc())
         return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
 
+FileNameParts = namedtuple('FileNameParts', ['batch', 'check_num', 'suffix'])
+
+def _parse_filename(file_name):
+    """
+    Split a check file_name into its parts in one pass
+    Format is typically: {batch}-{check_num}.pdf or {batch}-{check_num}-{suffix}.pdf
+    e.g. "156-002-main.pdf" -> FileNameParts('156', '002', 'main'), missing parts are '' / None
+    """
+    # Remove .pdf and COMPLETE suffix
+    parts = file_name.replace('.pdf', '').replace('-COMPLETE', '').split('-') if file_name else []
+    return FileNameParts(
+        batch=parts[0] if len(parts) >= 2 else '',
+        check_num=parts[1] if len(parts) >= 2 else None,
+        suffix=parts[2] if len(parts) >= 3 else None
+    )
+
 #░█▀▀░█▀█░█░░░▀█▀░▀█▀░░░█▀▀░█░█░█▀▀░█▀▀░█░█
 #░▀▀█░█▀▀░█░░░░█░░░█░░░░█░░░█▀█░█▀▀░█░░░█▀▄
 #░▀▀▀░▀░░░▀▀▀░▀▀▀░░▀░░░░▀▀▀░▀░▀░▀▀▀░▀▀▀░▀░▀
@@ -494,129 +698,63 @@ def split_check(check_id):
         if not selected_indices:
             return jsonify({"status": "error", "message": "No pages selected for split"}), 400
 
-        api_logger.info(f"Splitting check {check_id} - moving {len(selected_indices)} pages")
-        api_logger.info(f"Selected page indices: {selected_indices}")
+        api_logger.info("Splitting check %s - moving %s pages", check_id, len(selected_indices))
+        now_iso = utc_now_iso()
+        api_logger.debug("Selected page indices: %s", selected_indices)
 
         # Fetch current check
-        response = supabase_service.client.table('checks').select('id,file_name,batch_id,batch_id_fk,provider_name,insurance_company,claim_number,policy_number,amount,check_number,check_issue_date,pay_to,routing_number,account_number,memo,matter_name,matter_id,matter_url,case_type,delivery_service,tracking_number,claimant,insured_name,status,confidence_score,flags,validated_at,validated_by,reviewed_at,reviewed_by,created_at,updated_at,batch_images,page_count,check_type,n8n_sync_enabled,image_data,image_mime_type').eq('id', check_id).single().execute()
+        response = supabase_service.client.table('checks').select(CHECK_SPLIT_COLUMNS).eq('id', check_id).single().execute()
 
         if not response.data:
             return jsonify({"status": "error", "message": "Check not found"}), 404
 
         current_check = response.data
-        batch_images = current_check.get('batch_images', [])
+        page_count = current_check.get('page_count')
 
-        # Validate selection
-        if not batch_images:
-            return jsonify({"status": "error", "message": "No pages found in current check"}), 400
+        # Validate selection against page_count - batch_images itself stays in the database and
+        # apply_check_split re-validates against the real array when page_count is missing or stale
+        if page_count is not None:
+            if not page_count:
+                return jsonify({"status": "error", "message": "No pages found in current check"}), 400
 
-        if len(selected_indices) >= len(batch_images):
-            return jsonify({"status": "error", "message": "Cannot split all pages - at least one page must remain"}), 400
+            if len(set(selected_indices)) >= page_count:
+                return jsonify({"status": "error", "message": "Cannot split all pages - at least one page must remain"}), 400
 
-        # Validate all indices are valid
-        if any(idx < 0 or idx >= len(batch_images) for idx in selected_indices):
-            return jsonify({"status": "error", "message": "Invalid page index selected"}), 400
+            # Validate all indices are valid
+            if any(idx < 0 or idx >= page_count for idx in selected_indices):
+                return jsonify({"status": "error", "message": "Invalid page index selected"}), 400
 
-        # Split batch_images array - maintain order
-        split_images = [batch_images[i] for i in sorted(selected_indices)]
-        remaining_images = [batch_images[i] for i in range(len(batch_images)) if i not in selected_indices]
-
-        api_logger.info(f"📄 Total pages before split: {len(batch_images)}")
-        api_logger.info(f"📄 Selected indices (will be REMOVED from original): {sorted(selected_indices)}")
-        api_logger.info(f"📄 Remaining indices (will STAY in original): {[i for i in range(len(batch_images)) if i not in selected_indices]}")
-        api_logger.info(f"📄 Split pages (going to NEW check): {len(split_images)} pages")
-        api_logger.info(f"📄 Remaining pages (staying in ORIGINAL): {len(remaining_images)} pages")
-
-        # Log ALL pages with their filenames/URLs to verify correctsplit
-        api_logger.info("📄 === ORIGINAL BATCH IMAGES ===")
-        for idx, img in enumerate(batch_images):
-            filename = img.get('filename') or img.get('file_name') or 'unknown'
-            api_logger.info(f"   Index {idx}: {filename}")
-        
-        api_logger.info("📄 === SPLIT IMAGES (going to NEW check) ===")
-        for idx, img in enumerate(split_images):
-            filename = img.get('filename') or img.get('file_name') or 'unknown'
-            api_logger.info(f"   Index {idx}: {filename}")
-        
-        api_logger.info("📄 === REMAINING IMAGES (staying in ORIGINAL check) ===")
-        for idx, img in enumerate(remaining_images):
-            filename = img.get('filename') or img.get('file_name') or 'unknown'
-            api_logger.info(f"   Index {idx}: {filename}")
+        api_logger.debug("📄 Total pages before split: %s", page_count)
+        api_logger.debug("📄 Selected indices (will be REMOVED from original): %s", sorted(selected_indices))
 
         # Extract check number from file_name (e.g., "156-002.pdf" -> "002")
-        current_file_name = current_check.get('file_name', '')
-        api_logger.info(f"Current file_name: {current_file_name}")
-
-        # Parse the check number from file_name
-        # Format is typically: {batch}-{check_num}.pdf or {batch}-{check_num}-{suffix}.pdf
-        check_num = None
-        current_suffix = None
-        if current_file_name:
-            # Remove .pdf and COMPLETE suffix
-            clean_name = current_file_name.replace('.pdf', '').replace('-COMPLETE', '')
-            parts = clean_name.split('-')
-            if len(parts) >= 2:
-                # Get the second part (check number)
-                check_num = parts[1]  # e.g., "001", "002", "003"
-            if len(parts) >= 3:
-                # Check if there's already a suffix (main, 2, 3, etc.)
-                current_suffix = parts[2]
-                # 🔥 TREAT "-1" AS NO SUFFIX (it's from old upload convention)
-                # When splitting a "-1" check, rename it to "-main" like any unsplit check
-                if current_suffix == "1":
-                    api_logger.info(f"Found '-1' suffix (old upload convention), treating as unsplit check")
-                    current_suffix = None  # Treat as if it has no suffix
-                else:
-                    api_logger.info(f"Current check already has suffix: {current_suffix}")
+        current_file_name = current_check.get('file_name') or ''
+        api_logger.info("Current file_name: %s", current_file_name)
+
+        name_parts = _parse_filename(current_file_name)
+        batch_prefix = name_parts.batch
+        check_num = name_parts.check_num
+        current_suffix = name_parts.suffix
+        # 🔥 TREAT "-1" AS NO SUFFIX (it's from old upload convention)
+        # When splitting a "-1" check, rename it to "-main" like any unsplit check
+        if current_suffix == "1":
+            api_logger.info("Found '-1' suffix (old upload convention), treating as unsplit check")
+            current_suffix = None  # Treat as if it has no suffix
+        elif current_suffix is not None:
+            api_logger.info("Current check already has suffix: %s", current_suffix)
 
-        api_logger.info(f"Extracted check number: {check_num}, current suffix: {current_suffix}")
+        api_logger.info("Extracted check number: %s, current suffix: %s", check_num, current_suffix)
 
-        # Determine batch prefix for searching existing splits
-        batch_prefix = current_file_name.split('-')[0] if '-' in current_file_name else ''
+        # Splits of a split share the parent's counter (see add_split_counter.sql)
+        parent_id = current_check.get('parent_check_id') or check_id
 
-        # Find how many splits already exist for this check number
+        # The split suffix comes from the parent's split_counter inside apply_check_split, so it's
+        # only used up when the split commits. Without a batch prefix the first-split suffix is used
+        allocate_suffix = bool(check_num and batch_prefix and current_file_name)
         split_count = 2  # First split always creates 002-main and 002-2
-        if check_num and batch_prefix:
-            # Search for existing splits with pattern: {batch}-{check_num}-{suffix}
-            # e.g., "156-002-main", "156-002-2", "156-002-3"
-            search_pattern = f"{batch_prefix}-{check_num}-%"
-            try:
-                existing_splits_response = supabase_service.client.table('checks')\
-                    .select('file_name')\
-                    .like('file_name', search_pattern)\
-                    .execute()
-
-                if existing_splits_response.data:
-                    # Extract numeric split suffixes from existing splits
-                    split_numbers = []
-                    for check in existing_splits_response.data:
-                        fn = check.get('file_name', '')
-                        # Extract the suffix (e.g., "156-002-2.pdf" -> 2)
-                        parts = fn.replace('.pdf', '').replace('-COMPLETE', '').split('-')
-                        if len(parts) >= 3:
-                            suffix = parts[2]
-                            # Only count numeric suffixes (not "main")
-                            if suffix != "main":
-                                try:
-                                    split_num = int(suffix)
-                                    split_numbers.append(split_num)
-                                except ValueError:
-                                    pass
-
-                    if split_numbers:
-                        # Use the highest split number + 1
-                        split_count = max(split_numbers) + 1
-                        api_logger.info(f"Found existing numeric splits: {split_numbers}, using split count: {split_count}")
-                    else:
-                        # Only "main" exists, so this is the second split
-                        split_count = 2
-            except Exception as query_error:
-                api_logger.warning(f"Error querying existing splits: {query_error}, defaulting to split count 2")
-                split_count = 2
-
-        # Generate the new split check number and original check name
+
+        # Generate the original check name (the new one is named once the suffix is known)
         if check_num:
-            new_check_num = f"{check_num}-{split_count}"  # e.g., "002-2", "002-3"
             # Rename original to "main" if it doesn't already have a suffix
             if current_suffix is None:
                 original_check_num = f"{check_num}-main"  # Original becomes "002-main"
@@ -627,19 +765,16 @@ def split_check(check_id):
                 # Keep the current suffix (e.g., if splitting "002-2", it stays "002-2")
                 original_check_num = f"{check_num}-{current_suffix}"
         else:
-            # Fallback if no check number found
-            new_check_num = "SPLIT"
             original_check_num = check_num
 
-        api_logger.info(f"Original check will be renamed to: {original_check_num}")
-        api_logger.info(f"New split check number: {new_check_num}")
+        api_logger.info("Original check will be renamed to: %s", original_check_num)
 
         # Create new check record (only copy safe fields to avoid schema errors)
-        # Fields to explicitly exclude (timestamps, validation, system fields, form-only fields, and batch_images)
+        # Fields to explicitly exclude (timestamps, validation, system fields, form-only fields, and page_count)
         exclude_fields = {
             'id', 'created_at', 'updated_at', 'validated_at', 'validated_by',
             'reviewed_at', 'reviewed_by', 'n8n_sync_enabled', 'check_type_selection',
-            'batch_images', 'amount'  # Exclude batch_images (will set filtered version) and amount (will reset to 0)
+            'page_count', 'amount'  # page_count is set by apply_check_split, amount resets to 0
         }
 
         new_check_data = {
@@ -647,74 +782,24 @@ def split_check(check_id):
             if key not in exclude_fields
         }
 
-        # Update fields for new check
+        # Update fields for new check (batch_images/page_count are filled in by apply_check_split)
         new_check_data.update({
-            'batch_images': split_images,  # Use filtered images for selected pages only
-            'page_count': len(split_images),
+            'parent_check_id': parent_id,  # Further splits of the new check keep numbering from the parent
             'amount': 0.0,  # Reset amount so user can fill it in
             'status': 'pending',
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat(),
+            'created_at': now_iso,
+            'updated_at': now_iso,
             'n8n_sync_enabled': False
         })
 
-        # Set the split file_name (e.g., "156-001-2.pdf" for a split from "156-001.pdf")
-        if check_num and current_file_name:
-            # Generate new file_name with split suffix
-            batch_part = current_file_name.split('-')[0] if '-' in current_file_name else ''
-            new_file_name = f"{batch_part}-{new_check_num}.pdf" if batch_part else f"{new_check_num}.pdf"
-            new_check_data['file_name'] = new_file_name
-            api_logger.info(f"New check file_name: {new_file_name}")
-
-        # Insert new check
-        api_logger.info(f"Inserting new check record...")
-        api_logger.info(f"New check data keys: {list(new_check_data.keys())}")
-
-        try:
-            new_check_response = supabase_service.client.table('checks').insert(new_check_data).execute()
-        except Exception as insert_error:
-            api_logger.error(f"Insert error: {str(insert_error)}")
-            # If insert fails due to schema, try with minimal fields
-            api_logger.info("Retrying with minimal field set...")
-            minimal_data = {
-                'batch_images': split_images,
-                'page_count': len(split_images),
-                'status': 'pending',
-                'batch_id_fk': current_check.get('batch_id_fk'),
-                'created_at': datetime.utcnow().isoformat(),
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            # Add optional fields if they exist
-            if 'check_letter' in current_check:
-                minimal_data['check_letter'] = current_check.get('check_letter')
-            if 'batch_id' in current_check:
-                minimal_data['batch_id'] = current_check['batch_id']
-
-            # Set the file_name for the new split check
-            if check_num and batch_prefix:
-                new_file_name = f"{batch_prefix}-{new_check_num}.pdf"
-                minimal_data['file_name'] = new_file_name
-                api_logger.info(f"Minimal data - New check file_name: {new_file_name}")
-
-            new_check_response = supabase_service.client.table('checks').insert(minimal_data).execute()
-
-        if not new_check_response.data:
-            return jsonify({"status": "error", "message": "Failed to create new check"}), 500
-
-        new_check = new_check_response.data[0]
-        new_check_id = new_check['id']
+        # Set the split file_name (e.g., "156-001-2.pdf" for a split from "156-001.pdf") -
+        # apply_check_split appends the suffix it allocates when a batch prefix is known
+        if check_num and current_file_name and not allocate_suffix:
+            new_check_data['file_name'] = f"{check_num}-{split_count}.pdf"
 
-        api_logger.info(f"✅ New check created: {new_check_id} ({new_check_num})")
-
-        # Update current check - remove split pages and rename to -1 suffix if needed
-        api_logger.info(f"📄 === BEFORE UPDATE TO ORIGINAL CHECK ===")
-        api_logger.info(f"📄 Original batch_images had: {len(batch_images)} pages")
-        api_logger.info(f"📄 Will update with remaining_images: {len(remaining_images)} pages")
-        
+        # Update current check - apply_check_split removes the split pages, rename to -main suffix if needed
         update_data = {
-            'batch_images': remaining_images,
-            'page_count': len(remaining_images),
-            'updated_at': datetime.utcnow().isoformat()
+            'updated_at': now_iso
         }
 
         # Rename the original check to include -main suffix only if it doesn't already have a suffix
@@ -722,31 +807,37 @@ def split_check(check_id):
         if check_num and batch_prefix and original_check_num and current_suffix is None:
             original_file_name = f"{batch_prefix}-{original_check_num}.pdf"
             update_data['file_name'] = original_file_name
-            api_logger.info(f"Renaming original check to: {original_file_name}")
+            api_logger.info("Renaming original check to: %s", original_file_name)
         elif current_suffix is not None:
-            api_logger.info(f"Original check already has suffix '{current_suffix}', keeping file_name unchanged")
-
-        api_logger.info(f"📄 === UPDATING ORIGINAL CHECK {check_id} ===")
-        api_logger.info(f"📄 Update data - page_count: {update_data['page_count']}")
-        api_logger.info(f"📄 Update data - batch_images length: {len(update_data['batch_images'])}")
-        
-        update_response = supabase_service.client.table('checks').update(update_data).eq('id', check_id).execute()
+            api_logger.info("Original check already has suffix '%s', keeping file_name unchanged", current_suffix)
+
+        # Partition batch_images, insert new check + update original in one transaction (see create_apply_check_split.sql)
+        # Only the indices go over the wire; a failed update rolls the insert back server-side,
+        # and unknown keys are ignored by the function
+        api_logger.debug("📄 SPLITTING CHECK %s (insert + update), new check keys: %s", check_id, new_check_data.keys())
+        split_response = supabase_service.client.rpc('apply_check_split', {
+            'p_check_id': check_id,
+            'p_selected_indices': selected_indices,
+            'p_new_check': new_check_data,
+            'p_original_update': update_data,
+            'p_parent_id': parent_id,
+            'p_split_name_prefix': f"{batch_prefix}-{check_num}" if allocate_suffix else None
+        }).execute()
 
-        if not update_response.data:
-            # Rollback - delete the new check we just created
-            api_logger.error(f"❌ Failed to update current check - rolling back")
-            supabase_service.client.table('checks').delete().eq('id', new_check_id).execute()
-            return jsonify({"status": "error", "message": "Failed to update current check"}), 500
+        if not split_response.data:
+            return jsonify({"status": "error", "message": "Failed to split check"}), 500
 
-        api_logger.info(f"✅ Current check updated successfully")
+        split_count = split_response.data.get('split_suffix') or split_count
+        new_check_num = f"{check_num}-{split_count}" if check_num else "SPLIT"  # e.g., "002-2", "002-3"
+        new_check = split_response.data['new_check']
+        new_check_id = new_check['id']
+        api_logger.info("✅ New check created: %s (%s)", new_check_id, new_check_num)
+        api_logger.info("✅ Current check updated successfully")
         
-        # Verify the update by logging what came back
-        updated_check = update_response.data[0]
-        api_logger.info(f"📄 === AFTER UPDATE - VERIFICATION ===")
-        api_logger.info(f"📄 Updated check page_count: {updated_check.get('page_count')}")
-        api_logger.info(f"📄 Updated check batch_images length: {len(updated_check.get('batch_images', []))}")
-        if updated_check.get('batch_images'):
-            api_logger.info(f"📄 First page of updated check: {updated_check['batch_images'][0].get('filename') or updated_check['batch_images'][0].get('file_name')}")
+        # Verify the update by logging what came back (ids, names and page counts only)
+        updated_check = split_response.data['original']
+        api_logger.debug("📄 Updated check page_count: %s, new check page_count: %s",
+                         updated_check.get('page_count'), new_check.get('page_count'))
 
         # Get the actual identifier from the created check
         # Prefer file_name over check_identifier for display
@@ -762,13 +853,12 @@ def split_check(check_id):
             "new_check_identifier": display_name,
             "new_check_number": new_check_num,
             "current_check_id": check_id,
-            "split_pages": len(split_images),
-            "remaining_pages": len(remaining_images)
+            "split_pages": new_check.get('page_count'),
+            "remaining_pages": updated_check.get('page_count')
         })
 
     except Exception as e:
-        api_logger.error(f"Error splitting check {check_id}: {str(e)}")
-        import traceback
+        api_logger.error("Error splitting check %s: %s", check_id, e)
         api_logger.error(traceback.format_exc())
         return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
 
@@ -788,28 +878,27 @@ def delete_check(check_id):
         if not user:
             return jsonify({"status": "error", "message": "User not authenticated"}), 401
 
-        api_logger.info(f"Deleting check {check_id} by {user.get('preferred_username')}")
+        api_logger.info("Deleting check %s by %s", check_id, user.get('preferred_username'))
 
-        # Delete the check from Supabase
+        # Delete the check from Supabase - only the affected row count comes back, not the row
         response = supabase_service.client.table('checks')\
-            .delete()\
+            .delete(count='exact', returning='minimal')\
             .eq('id', check_id)\
             .execute()
 
         # Check if deletion was successful
-        if response.data or not response.data:  # Supabase returns empty array on successful delete
-            api_logger.info(f"Successfully deleted check {check_id}")
+        if response.count:
+            api_logger.info("Successfully deleted check %s", check_id)
             return jsonify({
                 "status": "success",
                 "message": "Check deleted successfully"
             })
         else:
-            api_logger.error(f"Failed to delete check {check_id}")
-            return jsonify({"status": "error", "message": "Failed to delete check"}), 500
+            api_logger.warning("Check %s not found for delete", check_id)
+            return jsonify({"status": "error", "message": "Check not found"}), 404
 
     except Exception as e:
-        api_logger.error(f"Error deleting check {check_id}: {str(e)}")
-        import traceback
+        api_logger.error("Error deleting check %s: %s", check_id, e)
         api_logger.error(traceback.format_exc())
         return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
 
@@ -829,10 +918,10 @@ def flag_needs_review(check_id):
         # Get form data from request
         form_data = request.get_json() or {}
         reason = form_data.get('reason', 'No reason provided')
-        api_logger.info(f"Setting check {check_id} to needs_review by {user.get('preferred_username')} - Reason: {reason}")
+        api_logger.info("Setting check %s to needs_review by %s - Reason: %s", check_id, user.get('preferred_username'), reason)
         
         # Update timestamp 
-        timestamp = datetime.utcnow().isoformat()
+        timestamp = utc_now_iso()
         
         # Update the check in Supabase with needs_review status
         update_data = {
@@ -842,31 +931,27 @@ def flag_needs_review(check_id):
         
         # Include any form field updates (but exclude form-only fields that don't exist in database)
         # Date fields that need special handling (empty string -> None)
-        date_fields = ['check_issue_date', 'date_of_loss']
-
-        for field, value in form_data.items():
-            if field not in ['status', 'updated_at', 'reason', 'check_type_selection', 'sf_claim_number', 'sf_policy_number']:
-                # Convert empty strings to None for date fields
-                if field in date_fields and value == '':
-                    update_data[field] = None
-                else:
-                    update_data[field] = value
+        update_data.update({
+            field: None if field in DATE_FIELDS and value == '' else value
+            for field, value in form_data.items()
+            if field not in NEEDS_REVIEW_SKIP_FIELDS
+        })
         
         response = supabase_service.client.table('checks').update(update_data).eq('id', check_id).execute()
         
         if response.data:
-            api_logger.info(f"Check {check_id} STATUS CHANGED TO NEEDS_REVIEW by {user.get('preferred_username')}")
+            api_logger.info("Check %s STATUS CHANGED TO NEEDS_REVIEW by %s", check_id, user.get('preferred_username'))
             return jsonify({
                 "status": "success", 
                 "message": "Check status changed to needs review",
                 "new_status": "needs_review"
             })
         else:
-            api_logger.error(f"No data returned when updating check {check_id} to needs_review")
+            api_logger.error("No data returned when updating check %s to needs_review", check_id)
             return jsonify({"status": "error", "message": "Failed to update check status"}), 500
             
     except Exception as e:
-        api_logger.error(f"Error flagging check {check_id} for review: {str(e)}")
+        api_logger.error("Error flagging check %s for review: %s", check_id, e)
         return jsonify({"status": "error", "message": f"Server error: {str(e)}"}), 500
 
 #░█▀▀░█▀▀░▀█▀░░░█▀▀░█░█░█▀▀░█▀▀░█░█░░░█▀▄░█▀▀░▀█▀░█▀█░▀█▀░█░░░█▀▀
@@ -876,24 +961,83 @@ def flag_needs_review(check_id):
 @api_bp.route("/api/checks/<check_id>", methods=["GET"])
 @login_required
 def get_check_details(check_id):
-    """Get detailed information for a specific check"""
+    """
+    Get detailed information for a specific check
+    Page/image blobs are only included with ?include=images (or use /api/checks/<id>/images)
+    ?fields=id,status,amount narrows the select to whitelisted columns
+    """
     try:
-        response = supabase_service.client.table('checks').select('id,file_name,batch_id,batch_id_fk,provider_name,insurance_company,claim_number,policy_number,amount,check_number,check_issue_date,pay_to,routing_number,account_number,memo,matter_name,matter_id,matter_url,case_type,delivery_service,tracking_number,claimant,insured_name,status,confidence_score,flags,validated_at,validated_by,reviewed_at,reviewed_by,created_at,updated_at,batch_images,page_count,check_type,n8n_sync_enabled,image_data,image_mime_type').eq('id', check_id).single().execute()
-        
-        if response.data:
+        requested_fields = request.args.get('fields')
+        if requested_fields is not None:
+            # Whitelisted names only - the value goes straight into the PostgREST select
+            fields = [f.strip() for f in requested_fields.split(',') if f.strip()]
+            if not fields:
+                return jsonify({"status": "error", "message": "fields must name at least one column"}), 400
+            invalid = [f for f in fields if f not in ALLOWED_CHECK_FIELDS]
+            if invalid:
+                return jsonify({"status": "error", "message": f"Unknown fields: {', '.join(invalid)}"}), 400
+            columns = ','.join(fields)
+        else:
+            columns = CHECK_DETAIL_COLUMNS
+        include_images = request.args.get('include') == 'images'
+        if include_images:
+            columns += ',batch_images'
+        # limit(1) + unpack: a miss is an empty list, not a 406 raised through the client
+        response = supabase_service.client.table('checks').select(columns).eq('id', check_id).limit(1).execute()
+        check = response.data[0] if response.data else None
+        
+        if check:
+            if include_images:
+                check['image_url'] = check_image_url(check_id)
             # Ensure provider_name is available (fallback to pay_to or claimant)
-            if not response.data.get('provider_name'):
-                response.data['provider_name'] = response.data.get('pay_to') or response.data.get('claimant')
+            if 'provider_name' in check and not check.get('provider_name'):
+                check['provider_name'] = check.get('pay_to') or check.get('claimant')
             
-            return jsonify({
+            return orjson_response({
                 "status": "success",
-                "check": response.data
+                "check": check
             })
         else:
             return jsonify({"status": "error", "message": "Check not found"}), 404
             
     except Exception as e:
-        api_logger.error(f"Error getting check {check_id}: {str(e)}")
+        api_logger.error("Error getting check %s: %s", check_id, e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+#░█▀▀░█░█░█▀▀░█▀▀░█░█░░░▀█▀░█▄█░█▀█░█▀▀░█▀▀░█▀▀
+#░█░░░█▀█░█▀▀░█░░░█▀▄░░░░█░░█░█░█▀█░█░█░█▀▀░▀▀█
+#░▀▀▀░▀░▀░▀▀▀░▀▀▀░▀░▀░░░▀▀▀░▀░▀░▀░▀░▀▀▀░▀▀▀░▀▀▀
+
+def check_image_url(check_id):
+    """
+    Binary URL for a check's first image - the browser fetches it directly instead of
+    decoding base64 image_data out of JSON (image-proxy serves image_data or batch_images[0])
+    """
+    return url_for('dashboard.proxy_check_image', check_id=check_id, image_index=0)
+
+@api_bp.route("/api/checks/<check_id>/images", methods=["GET"])
+@login_required
+def get_check_images(check_id):
+    """Get only the page/image data for a check - lazy-loaded counterpart to get_check_details"""
+    try:
+        response = supabase_service.client.table('checks')\
+            .select('id,batch_images,page_count')\
+            .eq('id', check_id)\
+            .limit(1)\
+            .execute()
+        
+        if not response.data:
+            return jsonify({"status": "error", "message": "Check not found"}), 404
+        
+        return orjson_response({
+            "status": "success",
+            "check_id": check_id,
+            "image_url": check_image_url(check_id),
+            **response.data[0]
+        })
+        
+    except Exception as e:
+        api_logger.error("Error getting images for check %s: %s", check_id, e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 #░█▀▀░█░░░█▀█░▀█▀░█▄█░█▀█░█▀█░▀█▀░█▀▀░░░█░░░▀█▀░█▀▀░▀█▀
@@ -910,30 +1054,14 @@ def get_claimants_list():
     try:
         api_logger.info("Fetching unique claimant names from Supabase (fallback)")
         
-        # Get all checks with claimant data
-        response = supabase_service.client.table('checks')\
-            .select('claimant')\
-            .not_.is_('claimant', 'null')\
+        # Distinct, cleaned and sorted in Postgres (see create_unique_claimants_view.sql)
+        response = supabase_service.client.table('unique_claimants')\
+            .select('name')\
             .execute()
         
-        if not response.data:
-            return jsonify({
-                "status": "success",
-                "claimants": [],
-                "source": "supabase"
-            })
-        
-        # Extract unique claimant names (filter out None, empty, "None" strings)
-        claimants_set = set()
-        for check in response.data:
-            claimant = check.get('claimant', '').strip()
-            if claimant and claimant.lower() not in ['none', 'null', '']:
-                claimants_set.add(claimant)
+        unique_claimants = [row['name'] for row in response.data or []]
         
-        # Sort alphabetically
-        unique_claimants = sorted(list(claimants_set))
-        
-        api_logger.info(f"Returning {len(unique_claimants)} unique claimant names from Supabase")
+        api_logger.info("Returning %s unique claimant names from Supabase", len(unique_claimants))
         
         return jsonify({
             "status": "success",
@@ -943,9 +1071,123 @@ def get_claimants_list():
         })
         
     except Exception as e:
-        api_logger.error(f"Error fetching claimants list: {str(e)}")
+        api_logger.error("Error fetching claimants list: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# Jai's Salesforce endpoint (shared by claimant lookup and real-time search)
+SALESFORCE_URL = "https://sweetjames.my.salesforce-sites.com/SmartAgent/services/apexrest/AI_Flask_App_Fetch_Matter"
+SALESFORCE_TOKEN = "00D5f000000JpstEAC"
+
+# Shared pooled session - keeps TCP/TLS to Salesforce warm between keystrokes
+_salesforce_session = requests.Session()
+_salesforce_session.headers.update({'Content-Type': 'application/json'})
+_salesforce_session.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=32,
+    # Connect failures and 502/503/504 are retried; read timeouts are not - re-sending a hung read would
+    # stack another full timeout per attempt and surface as ConnectionError instead of Timeout
+    max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.2, status_forcelist=[502, 503, 504], allowed_methods=['GET'])
+))
+
+# In-memory cache for Salesforce search results (2 minute TTL) - typing fires one search per keystroke
+salesforce_cache = {}
+SALESFORCE_CACHE_TTL = 120  # 2 minutes
+SALESFORCE_CACHE_MAX = 2048
+
+# Searches currently on the wire: cache key -> Future, so concurrent identical searches share one call
+salesforce_inflight = {}
+salesforce_inflight_lock = threading.Lock()
+
+# Circuit breaker: after 5 connection/5xx failures within 30s, skip Salesforce for 60s
+# instead of holding every keystroke for the full 10s timeout during an outage
+SALESFORCE_BREAKER_THRESHOLD = 5
+SALESFORCE_BREAKER_WINDOW = 30
+SALESFORCE_BREAKER_COOLDOWN = 60
+salesforce_breaker = {'failures': [], 'open_until': 0.0}
+salesforce_breaker_lock = threading.Lock()
+
+def record_salesforce_failure():
+    """Count a failed Salesforce call and open the circuit once the threshold is hit"""
+    now = time.time()
+    with salesforce_breaker_lock:
+        failures = [t for t in salesforce_breaker['failures'] if now - t < SALESFORCE_BREAKER_WINDOW]
+        failures.append(now)
+        salesforce_breaker['failures'] = failures
+        if len(failures) >= SALESFORCE_BREAKER_THRESHOLD:
+            salesforce_breaker['open_until'] = now + SALESFORCE_BREAKER_COOLDOWN
+            salesforce_breaker['failures'] = []
+            api_logger.warning("⚡ Salesforce circuit OPEN for %ss after %s failures", SALESFORCE_BREAKER_COOLDOWN, len(failures))
+
+def salesforce_search(search_key):
+    """
+    Call the Salesforce matter search and return the parsed JSON.
+    Results are cached per normalized search key, so both endpoints share hits,
+    and concurrent identical searches wait on the one request already in flight.
+    Returns None without calling out while the circuit breaker is open.
+    """
+    cache_key = search_key.strip().lower()
+    cached = salesforce_cache.get(cache_key)
+    if cached:
+        result, timestamp = cached
+        if time.time() - timestamp < SALESFORCE_CACHE_TTL:
+            api_logger.info("💨 Salesforce cache HIT: '%s'", cache_key)
+            return result
+        salesforce_cache.pop(cache_key, None)
+
+    if time.time() < salesforce_breaker['open_until']:
+        api_logger.warning("⚡ Salesforce circuit open - skipping search for '%s'", cache_key)
+        return None
+
+    # Join an identical search that's already in flight instead of calling Salesforce again
+    with salesforce_inflight_lock:
+        future = salesforce_inflight.get(cache_key)
+        is_leader = future is None
+        if is_leader:
+            future = salesforce_inflight[cache_key] = Future()
+    if not is_leader:
+        api_logger.info("🔗 Joining in-flight Salesforce search: '%s'", cache_key)
+        return future.result()
+
+    try:
+        result = fetch_salesforce_search(search_key)
+    except BaseException as e:
+        # Outage-type failures count toward the breaker; 4xx responses are our request's fault
+        response = getattr(e, 'response', None)
+        if isinstance(e, requests.exceptions.RequestException) and (response is None or response.status_code >= 500):
+            record_salesforce_failure()
+        future.set_exception(e)
+        raise
+    else:
+        with salesforce_breaker_lock:
+            salesforce_breaker['failures'] = []  # Reset on the first success
+        future.set_result(result)
+    finally:
+        with salesforce_inflight_lock:
+            salesforce_inflight.pop(cache_key, None)
+
+    # Drop the oldest entry once full (dicts keep insertion order)
+    if len(salesforce_cache) >= SALESFORCE_CACHE_MAX:
+        salesforce_cache.pop(next(iter(salesforce_cache)), None)
+    salesforce_cache[cache_key] = (result, time.time())
+    return result
+
+def fetch_salesforce_search(search_key):
+    """Uncached Salesforce matter search - use salesforce_search()"""
+    # Payload format from Jai's specs (GET request with JSON body - unusual but that's what Salesforce wants)
+    payload = {
+        'searchKey': search_key,
+        'token': SALESFORCE_TOKEN
+    }
+
+    api_logger.info("Calling Salesforce API with searchKey: %s", search_key)
+    response = _salesforce_session.get(
+        SALESFORCE_URL,
+        json=payload,
+        timeout=10
+    )
+    response.raise_for_status()  # Raise error for bad status codes
+    return orjson.loads(response.content)
+
 #░█▀▀░█▀█░█░░░█▀▀░█▀▀░█▀▀░█▀█░█▀▄░█▀▀░█▀▀░░░█▀▀░█░░░█▀█░▀█▀░█▄█░█▀█░█▀█░▀█▀░░░█░░░█▀█░█▀█░█░█░█░█░█▀█
 #░▀▀█░█▀█░█░░░█▀▀░▀▀█░█▀▀░█░█░█▀▄░█░░░█▀▀░░░█░░░█░░░█▀█░░█░░█░█░█▀█░█░█░░█░░░░█░░░█░█░█░█░█▀▄░█░█░█▀▀
 #░▀▀▀░▀░▀░▀▀▀░▀▀▀░▀▀▀░▀░░░▀▀▀░▀░▀░▀▀▀░▀▀▀░░░▀▀▀░▀▀▀░▀░▀░▀▀▀░▀░▀░▀░▀░▀░▀░░▀░░░░▀▀▀░▀▀▀░▀▀▀░▀░▀░▀▀▀░▀░░
@@ -972,8 +1214,6 @@ def salesforce_claimant_lookup():
         Token: 00DEc00000H8mAZMAZ
     """
     try:
-        import os
-        import requests
         
         data = request.get_json()
         claimant_name = data.get('claimant_name', '').strip()
@@ -984,46 +1224,20 @@ def salesforce_claimant_lookup():
                 "message": "No claimant name provided"
             }), 400
         
-        api_logger.info(f"🔍 Salesforce lookup for: '{claimant_name}'")
-        
-        # =============================================================================
-        # SALESFORCE CONFIGURATION
-        # =============================================================================
+        api_logger.info("🔍 Salesforce lookup for: '%s'", claimant_name)
         
-        # Jai's Salesforce endpoint
-        salesforce_url = "https://sweetjames.my.salesforce-sites.com/SmartAgent/services/apexrest/AI_Flask_App_Fetch_Matter"
-        salesforce_token = "00D5f000000JpstEAC"
-            
         # =============================================================================
-        # Call Salesforce API
+        # Call Salesforce API (cached - see salesforce_search)
         # =============================================================================
         
-        # Payload format from Jai's specs (GET request with JSON body)
-        payload = {  
-            'searchKey': claimant_name,
-            'token': salesforce_token
-        }
-        
-        headers = {
-            'Content-Type': 'application/json'
-        }
-        
-        api_logger.info(f"Calling Salesforce API with searchKey: {claimant_name}")
-             
-        # Note: GET request with JSON body (unusual but that's what Salesforce wants)
-        response = requests.request(
-            'GET',
-            salesforce_url,
-            json=payload,
-            headers=headers,
-            timeout=10
-        )
-        
-        response.raise_for_status()  # Raise error for bad status codes
-        
-        result = response.json()
+        result = salesforce_search(claimant_name)
+        if result is None:
+            return jsonify({
+                "status": "error",
+                "message": "Salesforce is temporarily unavailable - try again shortly"
+            }), 503
         
-        api_logger.info(f"✅ Salesforce API response: {result}")
+        api_logger.debug("✅ Salesforce API response: %s", result)
         
         # Parse Salesforce response
         # Salesforce returns an array of matches with these field names:
@@ -1040,16 +1254,19 @@ def salesforce_claimant_lookup():
             insurance_numbers = []
 
             if isinstance(insurances, list):
-                api_logger.info(f"🔍 [SINGLE MATCH] Insurances is a list with {len(insurances)} items")
+                api_logger.info("🔍 [SINGLE MATCH] Insurances is a list with %s items", len(insurances))
+                log_insurances = api_logger.isEnabledFor(logging.DEBUG)
                 for insurance in insurances:
-                    api_logger.info(f"🔍 [SINGLE MATCH] Processing insurance item: {insurance}")
-                    api_logger.info(f"🔑 [SINGLE MATCH] Available keys in insurance object: {list(insurance.keys())}")
+                    if log_insurances:
+                        api_logger.debug("🔍 [SINGLE MATCH] Processing insurance item: %s", insurance)
+                        api_logger.debug("🔑 [SINGLE MATCH] Available keys in insurance object: %s", list(insurance.keys()))
                     claim_num = insurance.get('ClaimNumber')
                     policy_num = insurance.get('PolicyNumber')
                     insurance_id = insurance.get('InsuranceId', '')
                     insurance_company_name = insurance.get('InsuranceCompanyName', '')
                     insurance_company_id = insurance.get('InsuranceCompanyId', '')
-                    api_logger.info(f"🔍 [SINGLE MATCH] Extracted - Claim: {claim_num}, Policy: {policy_num}, Company: {insurance_company_name}, InsuranceId: {insurance_id}")
+                    if log_insurances:
+                        api_logger.debug("🔍 [SINGLE MATCH] Extracted - Claim: %s, Policy: %s, Company: %s, InsuranceId: %s", claim_num, policy_num, insurance_company_name, insurance_id)
 
                     if claim_num:
                         insurance_numbers.append({
@@ -1101,15 +1318,14 @@ def salesforce_claimant_lookup():
         }), 504
         
     except requests.exceptions.RequestException as e:
-        api_logger.error(f"Salesforce API error: {str(e)}")
+        api_logger.error("Salesforce API error: %s", e)
         return jsonify({
             "status": "error",
             "message": f"Salesforce connection failed: {str(e)}"
         }), 500
         
     except Exception as e:
-        api_logger.error(f"Salesforce lookup error: {str(e)}")
-        import traceback
+        api_logger.error("Salesforce lookup error: %s", e)
         api_logger.error(traceback.format_exc())
         
         return jsonify({
@@ -1158,7 +1374,6 @@ def salesforce_search_claimants():
     }
     """
     try:
-        import requests
         
         search_query = request.args.get('q', '').strip()
         
@@ -1171,39 +1386,22 @@ def salesforce_search_claimants():
                 "message": "Type at least 2 characters"
             })
         
-        api_logger.info(f"🔍 Real-time Salesforce search: '{search_query}'")
-        
-        # Salesforce configuration
-        salesforce_url = "https://sweetjames.my.salesforce-sites.com/SmartAgent/services/apexrest/AI_Flask_App_Fetch_Matter"
-        salesforce_token = "00D5f000000JpstEAC"
-        
-        # Call Salesforce
-        payload = {
-            'searchKey': search_query,
-            'token': salesforce_token
-        }
-        
-        headers = {
-            'Content-Type': 'application/json'
-        }
+        api_logger.info("🔍 Real-time Salesforce search: '%s'", search_query)
         
-        response = requests.request(
-            'GET',
-            salesforce_url,
-            json=payload,
-            headers=headers,
-            timeout=10
-        )
-        
-        response.raise_for_status()
-        result = response.json()
+        # Call Salesforce (cached - repeat keystrokes/prefixes within the TTL skip the round trip)
+        result = salesforce_search(search_query)
+        if result is None:
+            return orjson_response({
+                "status": "success",
+                "results": [],
+                "total": 0,
+                "source": "salesforce-circuit-open"
+            })
         
-        # 📦 LOG FULL SALESFORCE RESPONSE PAYLOAD
-        api_logger.info(f"📦 FULL Salesforce Response Payload:")
-        api_logger.info(f"   Type: {type(result)}")
-        api_logger.info(f"   Length: {len(result) if isinstance(result, list) else 'N/A'}")
-        import json
-        api_logger.info(f"   Complete JSON:\n{json.dumps(result, indent=2)}")
+        # 📦 Summary at INFO - the full payload is only serialized when DEBUG is on
+        api_logger.info("📦 Salesforce response: %s, length %s", type(result).__name__, len(result) if isinstance(result, (list, dict)) else 'N/A')
+        if api_logger.isEnabledFor(logging.DEBUG):
+            api_logger.debug("   Complete JSON:\n%s", orjson.dumps(result, option=orjson.OPT_INDENT_2).decode('utf-8'))
         
         # 🔥 Extract from jsonResponse array
         # Salesforce returns: {jsonResponse: [{...data...}]}
@@ -1213,24 +1411,15 @@ def salesforce_search_claimants():
             if isinstance(json_response, list) and len(json_response) > 0:
                 results = json_response  # Array of Salesforce records
         
-        api_logger.info(f"✅ Returning {len(results)} Salesforce records for '{search_query}'")
+        api_logger.info("✅ Returning %s Salesforce records for '%s'", len(results), search_query)
         
-        return jsonify({
+        return orjson_response({
             "status": "success",
             "results": results,
             "total": len(results),
             "source": "salesforce"
         })
         
-    except Exception as e:
-        api_logger.error(f"Salesforce search error: {str(e)}")
-        return jsonify({
-            "status": "error",
-            "message": str(e),
-            "claimants": [],
-            "total": 0
-        }), 500
-        
     except requests.exceptions.Timeout:
         api_logger.error("Salesforce API timeout")
         return jsonify({
@@ -1239,22 +1428,53 @@ def salesforce_search_claimants():
         }), 504
         
     except requests.exceptions.RequestException as e:
-        api_logger.error(f"Salesforce API error: {str(e)}")
+        api_logger.error("Salesforce API error: %s", e)
         return jsonify({
             "status": "error",
             "message": f"Salesforce connection failed: {str(e)}"
         }), 500
         
     except Exception as e:
-        api_logger.error(f"Salesforce lookup error: {str(e)}")
-        import traceback
+        api_logger.error("Salesforce search error: %s", e)
         api_logger.error(traceback.format_exc())
-              
         return jsonify({
             "status": "error",
-            "message": str(e)
+            "message": str(e),
+            "claimants": [],
+            "total": 0
         }), 500
 
+def count_check_stats():
+    """Fallback for get_check_stats when the check_stats() RPC is missing"""
+    response = supabase_service.client.table('checks').select('status, confidence_score').execute()
+    checks = response.data or []
+    
+    # One pass over the rows - every counter updated per check
+    pending = approved = rejected = high_confidence = low_confidence = 0
+    for c in checks:
+        status = c.get('status')
+        if status == 'pending':
+            pending += 1
+        elif status == 'approved':
+            approved += 1
+        elif status == 'rejected':
+            rejected += 1
+        
+        confidence = c.get('confidence_score') or 0
+        if confidence > 0.8:
+            high_confidence += 1
+        elif confidence < 0.7:
+            low_confidence += 1
+    
+    return {
+        "total": len(checks),
+        "pending": pending,
+        "approved": approved,
+        "rejected": rejected,
+        "high_confidence": high_confidence,
+        "low_confidence": low_confidence
+    }
+
 #░█▀▀░█░█░█▀▀░█▀▀░█░█░░░█▀▀░▀█▀░█▀█░▀█▀░█▀▀
 #░█░░░█▀█░█▀▀░█░░░█▀▄░░░▀▀█░░█░░█▀█░░█░░▀▀█
 #░▀▀▀░▀░▀░▀▀▀░▀▀▀░▀░▀░░░▀▀▀░░▀░░▀░▀░░▀░░▀▀▀
@@ -1265,34 +1485,14 @@ def salesforce_search_claimants():
 def get_check_stats():
     """Get check processing statistics"""
     try:
-        # Get all checks
-        response = supabase_service.client.table('checks').select('status, confidence_score, created_at').execute()
-        
-        if not response.data:
-            return jsonify({
-                "status": "success",
-                "stats": {
-                    "total": 0,
-                    "pending": 0,
-                    "approved": 0,
-                    "rejected": 0,
-                    "high_confidence": 0,
-                    "low_confidence": 0
-                }
-            })
-        
-        checks = response.data
-        total = len(checks)
-        
-        # Calculate statistics
-        stats = {
-            "total": total,
-            "pending": len([c for c in checks if c.get('status') == 'pending']),
-            "approved": len([c for c in checks if c.get('status') == 'approved']),
-            "rejected": len([c for c in checks if c.get('status') == 'rejected']),
-            "high_confidence": len([c for c in checks if (c.get('confidence_score') or 0) > 0.8]),
-            "low_confidence": len([c for c in checks if (c.get('confidence_score') or 0) < 0.7])
-        }
+        # Counts are aggregated in Postgres (see create_check_stats.sql) - one row back instead of every check
+        try:
+            response = supabase_service.client.rpc('check_stats').execute()
+            stats = response.data[0]
+        except Exception as e:
+            # check_stats() not deployed yet - count rows in Python
+            api_logger.warning("check_stats RPC unavailable, counting rows: %s", e)
+            stats = count_check_stats()
         
         return jsonify({
             "status": "success",
@@ -1300,7 +1500,7 @@ def get_check_stats():
         })
         
     except Exception as e:
-        api_logger.error(f"Error getting check stats: {str(e)}")
+        api_logger.error("Error getting check stats: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 #░█▀▄░█▀█░▀█▀░█▀▀░█░█░░░█▀▀░█░█░█▀▀░█▀▀░█░█░█▀▀
@@ -1311,33 +1511,30 @@ def get_check_stats():
 def get_batch_checks(batch_id):
     """Get all checks for a specific batch - AJAX endpoint (no auth required, page is already protected)"""
     try:
-        api_logger.info(f"API: Loading checks for batch {batch_id}")
+        api_logger.info("API: Loading checks for batch %s", batch_id)
         
         response = supabase_service.client.table('checks')\
-            .select('id,file_name,batch_id,batch_id_fk,provider_name,insurance_company,claim_number,policy_number,amount,check_number,check_issue_date,pay_to,routing_number,account_number,memo,matter_name,matter_id,matter_url,case_type,delivery_service,tracking_number,claimant,insured_name,status,confidence_score,flags,validated_at,validated_by,reviewed_at,reviewed_by,created_at,updated_at,batch_images,page_count')\
+            .select(CHECK_LIST_COLUMNS)\
             .eq('batch_id', batch_id)\
             .order('created_at', desc=True)\
             .execute()
         
-        # Format checks for display
-        formatted_checks = []
-        for check in response.data:
-            formatted_check = check.copy()
-            confidence_score = check.get('confidence_score', 0)
-            formatted_check['confidence_percentage'] = round(confidence_score * 100, 1) if confidence_score else 0
-            formatted_checks.append(formatted_check)
+        # Format checks for display (rows are ours - annotate in place, no per-row copy)
+        checks = response.data
+        for check in checks:
+            check['confidence_percentage'] = round((check.get('confidence_score') or 0) * 100, 1)
         
-        api_logger.info(f"API: Returning {len(formatted_checks)} checks for batch {batch_id}")
+        api_logger.info("API: Returning %s checks for batch %s", len(checks), batch_id)
         
-        return jsonify({
+        return orjson_response({
             "status": "success",
-            "checks": formatted_checks,
-            "total": len(formatted_checks),
+            "checks": checks,
+            "total": len(checks),
             "batch_id": batch_id
         })
         
     except Exception as e:
-        api_logger.error(f"Error getting batch checks: {str(e)}")
+        api_logger.error("Error getting batch checks: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 #░█▀▀░█░█░█▀▀░█▀▀░█░█░░░█▀█░█▀█░█▀▀░█▀▀░█▀▀
@@ -1349,7 +1546,7 @@ def get_batch_checks(batch_id):
 def get_check_pages(check_id):
     """Get all pages for a specific check - AJAX endpoint"""
     try:
-        api_logger.info(f"API: Loading pages for check {check_id}")
+        api_logger.info("API: Loading pages for check %s", check_id)
         
         response = supabase_service.client.table('check_pages')\
             .select('*')\
@@ -1357,9 +1554,9 @@ def get_check_pages(check_id):
             .order('page_number')\
             .execute()
         
-        api_logger.info(f"API: Returning {len(response.data) if response.data else 0} pages for check {check_id}")
+        api_logger.info("API: Returning %s pages for check %s", len(response.data) if response.data else 0, check_id)
         
-        return jsonify({
+        return orjson_response({
             "status": "success",
             "pages": response.data,
             "total": len(response.data) if response.data else 0,
@@ -1367,13 +1564,73 @@ def get_check_pages(check_id):
         })
         
     except Exception as e:
-        api_logger.error(f"Error getting check pages: {str(e)}")
+        api_logger.error("Error getting check pages: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+#░█▀▀░█░█░█▀▀░█▀▀░█░█░░░█░█░▀█▀░▀█▀░█░█░░░█▀█░█▀█░█▀▀░█▀▀░█▀▀
+#░█░░░█▀█░█▀▀░█░░░█▀▄░░░█▄█░░█░░░█░░█▀█░░░█▀▀░█▀█░█░█░█▀▀░▀▀█
+#░▀▀▀░▀░▀░▀▀▀░▀▀▀░▀░▀░░░▀░▀░▀▀▀░░▀░░▀░▀░░░▀░░░▀░▀░▀▀▀░▀▀▀░▀▀▀
+
+@api_bp.route("/api/checks/<check_id>/with-pages", methods=["GET"])
+@login_required
+def get_check_with_pages(check_id):
+    """
+    Get a check and all of its pages in one Supabase round trip
+    Replaces calling get_check_details + get_check_pages back to back
+    """
+    try:
+        # Pages are embedded through the check_pages -> checks FK (see add_check_pages_fk.sql)
+        response = supabase_service.client.table('checks')\
+            .select(CHECK_WITH_PAGES_COLUMNS)\
+            .eq('id', check_id)\
+            .order('page_number', foreign_table='check_pages')\
+            .limit(1)\
+            .execute()
+        
+        if not response.data:
+            return jsonify({"status": "error", "message": "Check not found"}), 404
+        
+        check = response.data[0]
+        pages = check.pop('check_pages', None) or []
+        
+        # Ensure provider_name is available (fallback to pay_to or claimant)
+        if not check.get('provider_name'):
+            check['provider_name'] = check.get('pay_to') or check.get('claimant')
+        
+        return orjson_response({
+            "status": "success",
+            "check": check,
+            "pages": pages,
+            "total_pages": len(pages)
+        })
+        
+    except Exception as e:
+        api_logger.error("Error getting check %s with pages: %s", check_id, e)
         return jsonify({"status": "error", "message": str(e)}), 500
   
 # =============================================================================
 # n8n for pink page detection API ENDPOINTS
 # =============================================================================
 
+@contextlib.contextmanager
+def spooled_upload(pdf_file):
+    """
+    Save an uploaded PDF to a temp file and yield its path.
+    Avoids holding the whole upload as a Python bytes object on top of
+    Werkzeug's spooled copy; the file is removed when the block exits.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+        pdf_file.save(tmp)
+        tmp.flush()
+        yield tmp.name
+
+@contextlib.contextmanager
+def open_uploaded_pdf(pdf_file):
+    """Open an uploaded PDF with MuPDF from a temp file, releasing it on every exit path"""
+    with spooled_upload(pdf_file) as pdf_path:
+        with contextlib.closing(fitz.open(pdf_path)) as pdf_document:
+            yield pdf_document
+
 #░█▀█░█▀▄░█▀█░░░█▀▀░█▀█░█░░░▀█▀░▀█▀░░░█▀█░█▀█░█▀█░█░░░█░█░█▀▀░▀█▀░█▀▀
 #░█░█░▀▀█░█░█░░░▀▀█░█▀▀░█░░░░█░░░█░░░░█▀█░█░█░█▀█░█░░░░█░░▀▀█░░█░░▀▀█
 #░▀░▀░▀▀░░▀░▀░░░▀▀▀░▀░░░▀▀▀░▀▀▀░░▀░░░░▀░▀░▀░▀░▀░▀░▀▀▀░░▀░░▀▀▀░▀▀▀░▀▀▀
@@ -1385,73 +1642,36 @@ def analyze_batch_splits():
             return jsonify({'error': 'No PDF file provided'}), 400
         
         pdf_file = request.files['pdf_file']
-        pdf_bytes = pdf_file.read()
         
-        import fitz
-        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-        total_pages = len(pdf_document)
-        
-        separator_page_indices = []
-        
-        for page_num in range(total_pages):
-            page = pdf_document[page_num]
-            text = page.get_text().upper()
-            
-            # Count how many separator keywords exist (with OCR tolerance)
-            keyword_score = 0
-            
-            # "AUTOMATICALLY" or variants
-            if any(variant in text for variant in ["AUTOMATIC", "AUTOMATICA"]):
-                keyword_score += 1
-            
-            # "SEPARATED" or variants  
-            if any(variant in text for variant in ["SEPARAT", "SEPERAT"]):
-                keyword_score += 1
-            
-            # "SORTED"
-            if "SORT" in text:
-                keyword_score += 1
+        with spooled_upload(pdf_file) as pdf_path:
+            with contextlib.closing(fitz.open(pdf_path)) as pdf_document:
+                total_pages = len(pdf_document)
             
-            # "INDEXED" or variants
-            if any(variant in text for variant in ["INDEX", "!NDEX", "1NDEX"]):
-                keyword_score += 1
-            
-            # "FOUNDATION" or variants
-            if any(variant in text for variant in ["FOUNDATION", "FIUNDATION", "FUUNDATION"]):
-                keyword_score += 1
-            
-            # "EXTRACT"
-            if "EXTRACT" in text:
-                keyword_score += 1
-            
-            # If page has at least 4 of the 6 keywords, it's a separator
-            if keyword_score >= 4:
-                separator_page_indices.append(page_num)
+            # Ranges come back in page order, so the indices stay sorted
+            separator_page_indices = find_separator_pages(pdf_path, total_pages)
         
         # Build sub-batches: content between separator pairs
         # Pairs: (3,4), (8,9), (13,14), etc.
         splits = []
         current_pos = 0
+        pair_open = False  # previous separator can still pair with the next one
+        prev_sep = -1
         
-        i = 0
-        while i < len(separator_page_indices):
-            sep_start = separator_page_indices[i]
-            
-            # Content from current position to separator start
-            if current_pos < sep_start:
-                splits.append({
-                    'start': current_pos,
-                    'end': sep_start - 1,
-                    'page_count': sep_start - current_pos
-                })
-            
-            # Skip separator pair (assume consecutive pages are pairs)
-            if i + 1 < len(separator_page_indices) and separator_page_indices[i + 1] == sep_start + 1:
-                current_pos = sep_start + 2  # Skip both separator pages
-                i += 2
+        for sep in separator_page_indices:
+            if pair_open and sep == prev_sep + 1:
+                # Second page of a separator pair (assume consecutive pages are pairs)
+                pair_open = False
             else:
-                current_pos = sep_start + 1  # Skip single separator
-                i += 1
+                # Content from current position to separator start
+                if current_pos < sep:
+                    splits.append({
+                        'start': current_pos,
+                        'end': sep - 1,
+                        'page_count': sep - current_pos
+                    })
+                pair_open = True
+            current_pos = sep + 1  # Skip past the separator
+            prev_sep = sep
         
         # Add final batch if there's content after last separator
         if current_pos < total_pages:
@@ -1461,24 +1681,21 @@ def analyze_batch_splits():
                 'page_count': total_pages - current_pos
             })
         
-        # Generate sub-batch labels using 3-digit numeric format (001, 002, 003, etc.)
-        sub_batches = [f"{i+1:03d}" for i in range(len(splits))]
-        
         # Add 1 to all page numbers for human-readable 1-based indexing
         separator_pages_display = [p + 1 for p in separator_page_indices]
+        
+        # Sub-batch labels use 3-digit numeric format (001, 002, 003, etc.) - built in the same pass
         splits_display = [
             {
-                'batch': sub_batches[i],
+                'batch': f"{i:03d}",
                 'start_page': s['start'] + 1,  # Convert to 1-based
                 'end_page': s['end'] + 1,      # Convert to 1-based
                 'page_count': s['page_count']
             }
-            for i, s in enumerate(splits)
+            for i, s in enumerate(splits, start=1)
         ]
         
-        pdf_document.close()
-        
-        return jsonify({
+        return orjson_response({
             'success': True,
             'total_pages': total_pages,
             'separator_pages_0based': separator_page_indices,
@@ -1488,11 +1705,101 @@ def analyze_batch_splits():
         })
         
     except Exception as e:
-        api_logger.error(f"ERROR: {str(e)}")
-        import traceback
+        api_logger.error("ERROR: %s", e)
         api_logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+def split_page_content(batch_number, file_name, pdf_bytes, deliver_urls):
+    """
+    Payload field for one split PDF: inline base64 by default, or - when the caller
+    asked for delivery=url - a public Supabase Storage URL so the response stays small.
+    """
+    if not deliver_urls:
+        return {'data': pybase64.b64encode_as_string(pdf_bytes)}
+    
+    storage_path = f"split-pages/{batch_number}/{file_name}"
+    check_documents.upload(storage_path, pdf_bytes, file_options={"content-type": "application/pdf", "upsert": "true"})
+    return {'url': CHECK_DOCUMENTS_PUBLIC_PREFIX + storage_path}
+
+def split_batches_error(batches, page_count):
+    """
+    Check split-pages batches against the uploaded PDF before anything is streamed -
+    once the 200 headers are out, a bad range could only truncate the body.
+    Returns an error message, or None when every batch is usable.
+    """
+    if not isinstance(batches, list) or not batches:
+        return 'batches must be a non-empty list'
+    for batch_info in batches:
+        if not isinstance(batch_info, dict) or 'batch' not in batch_info:
+            return 'Each batch needs batch, start_page and end_page'
+        start_page, end_page = batch_info.get('start_page'), batch_info.get('end_page')
+        if not isinstance(start_page, int) or not isinstance(end_page, int):
+            return f"Batch {batch_info['batch']}: start_page and end_page must be integers"
+        if not 1 <= start_page <= end_page <= page_count:
+            return f"Batch {batch_info['batch']}: pages {start_page}-{end_page} are outside the PDF's {page_count} pages"
+    return None
+
+def iter_split_pdfs(pdf_document, batch_number, batches):
+    """
+    Yield (batch, file_name, page_number, pdf_bytes) for every split PDF - the COMPLETE
+    PDF for each batch first, then its individual pages - one document at a time.
+    Batches must already have passed split_batches_error.
+    """
+    # Source document stays open for the whole stream - pages are copied out via insert_pdf
+    for batch_info in batches:
+        batch_letter = batch_info['batch']
+        start_page = batch_info['start_page'] - 1
+        end_page = batch_info['end_page'] - 1
+        
+        # Create COMPLETE PDF first (all pages in this check combined, one range copy)
+        with contextlib.closing(fitz.open()) as complete_pdf:
+            complete_pdf.insert_pdf(pdf_document, from_page=start_page, to_page=end_page)
+            complete_pdf_bytes = complete_pdf.tobytes()
+        
+        yield batch_letter, f"{batch_number}-{batch_letter}-COMPLETE.pdf", 'COMPLETE', complete_pdf_bytes
+        
+        # Extract each individual page in this batch - one scratch document reused for every page
+        with contextlib.closing(fitz.open()) as single_page_pdf:
+            for page_num in range(start_page, end_page + 1):
+                # Create single-page PDF (garbage=1 drops objects left behind by the previous page)
+                single_page_pdf.insert_pdf(pdf_document, from_page=page_num, to_page=page_num)
+                pdf_bytes_output = single_page_pdf.tobytes(garbage=1)
+                single_page_pdf.delete_page(0)
+                
+                page_number_in_batch = (page_num - start_page) + 1
+                yield batch_letter, f"{batch_number}-{batch_letter}-{page_number_in_batch}.pdf", page_number_in_batch, pdf_bytes_output
+
+class _ChunkSink:
+    """Write-only file object that collects tarfile output until the generator drains it"""
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def generate_split_tar(pdf_document, batch_number, batches):
+    """Stream the split PDFs as an uncompressed tar, one member per PDF - PDFs don't compress, so no gzip"""
+    sink = _ChunkSink()
+    try:
+        with tarfile.open(fileobj=sink, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+            for batch_letter, file_name, _, pdf_bytes in iter_split_pdfs(pdf_document, batch_number, batches):
+                info = tarfile.TarInfo(f"Batch {batch_number}-{batch_letter}/{file_name}")
+                info.size = len(pdf_bytes)
+                info.mtime = int(time.time())
+                tar.addfile(info, io.BytesIO(pdf_bytes))
+                yield sink.drain()
+        yield sink.drain()  # end-of-archive blocks written on close
+    except Exception as e:
+        # Headers are already sent - log and end the stream; the client sees a truncated archive
+        api_logger.error("ERROR in split-pages tar stream: %s", e)
+        api_logger.error(traceback.format_exc())
+
 #░█▀█░█▀▄░█▀█░░░█▀▀░█▀█░█░░░▀█▀░▀█▀░░░█▀█░█▀█░█▀▀░█▀▀░█▀▀
 #░█░█░▀▀█░█░█░░░▀▀█░█▀▀░█░░░░█░░░█░░░░█▀▀░█▀█░█░█░█▀▀░▀▀█
 #░▀░▀░▀▀░░▀░▀░░░▀▀▀░▀░░░▀▀▀░▀▀▀░░▀░░░░▀░░░▀░▀░▀▀▀░▀▀▀░▀▀▀
@@ -1502,6 +1809,10 @@ def split_pages():
     """
     Splits PDF into individual pages AND creates COMPLETE PDFs for each batch
     n8n will handle the folder creation and uploads
+    
+    Optional form field delivery=url returns a Supabase Storage 'url' per page
+    instead of the inline base64 'data'; delivery=tar streams the raw PDFs as a
+    tar archive ("Batch <batch_number>-<batch>/<file_name>" entries) with no base64 at all
     """
     try:
         api_logger.info("=== Split Pages endpoint called ===")
@@ -1512,76 +1823,66 @@ def split_pages():
         pdf_file = request.files['pdf_file']
         batch_number = request.form.get('batch_number')
         batches_json = request.form.get('batches')
+        deliver_urls = request.form.get('delivery') == 'url'
+        deliver_tar = request.form.get('delivery') == 'tar'
         
         if not all([batch_number, batches_json]):
             return jsonify({'error': 'Missing required parameters'}), 400
         
-        import json
-        import base64
         batches = json.loads(batches_json)
         
-        # Read PDF
-        pdf_bytes = pdf_file.read()
-        import fitz
-        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-        
-        pages_data = []
-        
-        # Process each batch
-        for batch_info in batches:
-            batch_letter = batch_info['batch'] 
-            start_page = batch_info['start_page'] - 1
-            end_page = batch_info['end_page'] - 1
-            
-            # Create COMPLETE PDF first (all pages in this check combined)
-            complete_pdf = fitz.open()
-            for page_num in range(start_page, end_page + 1):
-                complete_pdf.insert_pdf(pdf_document, from_page=page_num, to_page=page_num)
-            
-            complete_pdf_bytes = complete_pdf.tobytes()
-            complete_pdf.close()
-            
-            complete_file_name = f"{batch_number}-{batch_letter}-COMPLETE.pdf"
+        # Open the upload and validate every batch range BEFORE the streaming response starts, so a bad
+        # request still gets a proper 400 instead of a truncated 200. The document (and its temp file)
+        # stays open for the stream and is released when the response closes
+        upload = contextlib.ExitStack()
+        try:
+            pdf_document = upload.enter_context(open_uploaded_pdf(pdf_file))
+            batches_error = split_batches_error(batches, len(pdf_document))
+        except BaseException:
+            upload.close()
+            raise
+        if batches_error:
+            upload.close()
+            return jsonify({'error': batches_error}), 400
+        
+        if deliver_tar:
+            response = Response(stream_with_context(generate_split_tar(pdf_document, batch_number, batches)), mimetype='application/x-tar',
+                                headers={'Content-Disposition': f'attachment; filename="{batch_number}-split.tar"'})
+            response.call_on_close(upload.close)
+            return response
+        
+        # One COMPLETE PDF per batch plus one entry per page - known up front so it can lead the stream
+        total_pages = sum(b['end_page'] - b['start_page'] + 2 for b in batches)
+        
+        def generate_pages():
+            """Yield the response JSON one page at a time so only a single page's base64 is held in memory"""
+            yield orjson_bytes({'success': True, 'batch_number': batch_number, 'total_pages': total_pages})[:-1] + b',"pages":['
+            separator = b''
             
-            pages_data.append({
-                'batch': batch_letter,
-                'batch_folder': f"Batch {batch_number}-{batch_letter}",
-                'file_name': complete_file_name,
-                'page_number': 'COMPLETE',
-                'data': base64.b64encode(complete_pdf_bytes).decode('utf-8')
-            })
+            try:
+                for batch_letter, file_name, page_number, pdf_bytes in iter_split_pdfs(pdf_document, batch_number, batches):
+                    yield separator + orjson_bytes({
+                        'batch': batch_letter,
+                        'batch_folder': f"Batch {batch_number}-{batch_letter}",
+                        'file_name': file_name,
+                        'page_number': page_number,
+                        **split_page_content(batch_number, file_name, pdf_bytes, deliver_urls)
+                    })
+                    separator = b','
+            except Exception as e:
+                # Headers are already sent - log and end the stream; the client sees truncated JSON
+                api_logger.error("ERROR in split-pages stream: %s", e)
+                api_logger.error(traceback.format_exc())
+                return
             
-            # Extract each individual page in this batch        
-            for page_num in range(start_page, end_page + 1):
-                # Create single-page PDF
-                single_page_pdf = fitz.open()
-                single_page_pdf.insert_pdf(pdf_document, from_page=page_num, to_page=page_num)
-                pdf_bytes_output = single_page_pdf.tobytes()
-                single_page_pdf.close()
-                
-                page_number_in_batch = (page_num - start_page) + 1
-                file_name = f"{batch_number}-{batch_letter}-{page_number_in_batch}.pdf"
-                
-                pages_data.append({
-                    'batch': batch_letter,
-                    'batch_folder': f"Batch {batch_number}-{batch_letter}",
-                    'file_name': file_name,
-                    'page_number': page_number_in_batch,
-                    'data': base64.b64encode(pdf_bytes_output).decode('utf-8')
-                })
+            yield b']}'
         
-        pdf_document.close()
-        
-        return jsonify({
-            'success': True,
-            'batch_number': batch_number,
-            'total_pages': len(pages_data),
-            'pages': pages_data
-        })
+        response = Response(stream_with_context(generate_pages()), mimetype='application/json')
+        response.call_on_close(upload.close)
+        return response
         
     except Exception as e:
-        api_logger.error(f"ERROR in split-pages: {str(e)}")
-        import traceback
+        api_logger.error("ERROR in split-pages: %s", e)
         api_logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
@@ -1615,73 +1916,73 @@ def ingest_batch():
     """
     try:
         data = request.get_json()
-        api_logger.info(f"=== Ingesting batch: {data.get('batch_number')} ===")
-        
-        # 1. Check if batch already exists
-        existing_batch = supabase_service.client.table('batches')\
-            .select('id')\
-            .eq('folder_name', data['folder_name'])\
-            .execute()
-        
-        if existing_batch.data:
-            api_logger.info(f"Batch {data['folder_name']} already exists, skipping")
-            return jsonify({
-                'success': True,
-                'message': 'Batch already exists',
-                'batch_id': existing_batch.data[0]['id']
-            }), 200
+        api_logger.info("=== Ingesting batch: %s ===", data.get('batch_number'))
         
-        # 2. Create batch record
-        batch_result = supabase_service.client.table('batches').insert({
+        # 1. Create batch record - unique index on folder_name makes this idempotent
+        #    (ON CONFLICT DO NOTHING returns no rows when the batch already exists)
+        batch_result = supabase_service.client.table('batches').upsert({
             'batch_number': data['batch_number'],
             'batch_date': data['batch_date'],
             'folder_name': data['folder_name'],
             'onedrive_folder_id': data['onedrive_folder_id'],
             'total_checks': len(data['checks'])
-        }).execute()
+        }, on_conflict='folder_name', ignore_duplicates=True).execute()
+        
+        if not batch_result.data:
+            existing_batch = supabase_service.client.table('batches')\
+                .select('id')\
+                .eq('folder_name', data['folder_name'])\
+                .limit(1)\
+                .execute()
+            api_logger.info("Batch %s already exists, skipping", data['folder_name'])
+            return jsonify({
+                'success': True,
+                'message': 'Batch already exists',
+                'batch_id': existing_batch.data[0]['id'] if existing_batch.data else None
+            }), 200
         
         batch_id = batch_result.data[0]['id']
-        api_logger.info(f"Created batch record: {batch_id}")
+        api_logger.info("Created batch record: %s", batch_id)
         
-        # 3. Create check records
-        checks_created = 0
-        pages_created = 0
-        
-        for check_data in data['checks']:
-            check_identifier = f"{data['batch_number']}-{check_data['letter']}"
-            
-            # Insert check
-            check_result = supabase_service.client.table('checks').insert({
+        # 2. Create check records - one bulk insert for the whole batch
+        checks_payload = [
+            {
                 'batch_id_fk': batch_id,
                 'check_letter': check_data['letter'],
-                'check_identifier': check_identifier,
+                'check_identifier': f"{data['batch_number']}-{check_data['letter']}",
                 'subfolder_name': check_data['subfolder_name'],
                 'onedrive_folder_id': check_data['onedrive_folder_id'],
                 'page_count': len(check_data['pages']),
                 'status': 'pending',
                 'check_view_status': 'pending'
-            }).execute()
-            
-            check_id = check_result.data[0]['id']
-            checks_created += 1
-            api_logger.info(f"Created check: {check_identifier}")
-            
-            # 4. Create check_pages records
-            pages_to_insert = [
-                {
-                    'check_id': check_id,
-                    'page_number': page['page_number'],
-                    'file_name': page['file_name'],
-                    'onedrive_file_id': page['onedrive_file_id']
-                }
-                for page in check_data['pages']
-            ] 
-            
-            if pages_to_insert:
-                supabase_service.client.table('check_pages').insert(pages_to_insert).execute()
-                pages_created += len(pages_to_insert)
+            }
+            for check_data in data['checks']
+        ]
+        
+        checks_result = supabase_service.client.table('checks').insert(checks_payload).execute() if checks_payload else None
+        checks_created = len(checks_result.data) if checks_result else 0
+        api_logger.info("Created %s checks", checks_created)
+        
+        # Match returned ids back by identifier rather than relying on row order
+        check_ids = {row['check_identifier']: row['id'] for row in (checks_result.data if checks_result else [])}
+        
+        # 3. Create check_pages records - one bulk insert across every check
+        pages_to_insert = [
+            {
+                'check_id': check_ids[f"{data['batch_number']}-{check_data['letter']}"],
+                'page_number': page['page_number'],
+                'file_name': page['file_name'],
+                'onedrive_file_id': page['onedrive_file_id']
+            }
+            for check_data in data['checks']
+            for page in check_data['pages']
+        ]
+        
+        if pages_to_insert:
+            supabase_service.client.table('check_pages').insert(pages_to_insert).execute()
+        pages_created = len(pages_to_insert)
         
-        api_logger.info(f"✅ Batch ingestion complete: {checks_created} checks, {pages_created} pages")
+        api_logger.info("✅ Batch ingestion complete: %s checks, %s pages", checks_created, pages_created)
         
         return jsonify({
             'success': True,
@@ -1691,8 +1992,7 @@ def ingest_batch():
         }), 201
         
     except Exception as e:
-        api_logger.error(f"ERROR in batch ingestion: {str(e)}")
-        import traceback
+        api_logger.error("ERROR in batch ingestion: %s", e)
         api_logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
@@ -1713,14 +2013,14 @@ def api_health():
         
         return jsonify({
             "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now_iso(),
             "services": {
                 "supabase": supabase_health
             }
         })
         
     except Exception as e:
-        api_logger.error(f"API health check failed: {str(e)}")
+        api_logger.error("API health check failed: %s", e)
         return jsonify({
             "status": "unhealthy",
             "error": str(e)
@@ -20,6 +20,7 @@ Last Updated: September 2025
 from flask import Blueprint, redirect, url_for, session, request, render_template_string
 from msal import ConfidentialClientApplication
 from config import Config
+import threading
 import uuid
 
 # =============================================================================
@@ -36,6 +37,20 @@ AUTHORITY = config.azure_authority
 REDIRECT_PATH = "/getAToken"
 SCOPE = config.AZURE_SCOPE
 
+# Shared MSAL client - built on first use so authority discovery isn't repeated on every login
+_auth_app = None
+_auth_app_lock = threading.Lock()
+
+def get_auth_app():
+    global _auth_app
+    if _auth_app is None:
+        with _auth_app_lock:
+            if _auth_app is None:
+                _auth_app = ConfidentialClientApplication(
+                    CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET
+                )
+    return _auth_app
+
 # =============================================================================
 # AUTHENTICATION FLOW ROUTES
 # =============================================================================
@@ -47,9 +62,7 @@ SCOPE = config.AZURE_SCOPE
 @auth_bp.route("/login")
 def login():
     session["state"] = str(uuid.uuid4())
-    auth_app = ConfidentialClientApplication(
-        CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET
-    )
+    auth_app = get_auth_app()
     auth_url = auth_app.get_authorization_request_url(
         SCOPE,
         state=session["state"],
@@ -68,9 +81,7 @@ def authorized():
     if "error" in request.args:
         return f"Error: {request.args['error_description']}", 400
     code = request.args.get("code")
-    auth_app = ConfidentialClientApplication(
-        CLIENT_ID, authority=AUTHORITY, client_credential=CLIENT_SECRET
-    )
+    auth_app = get_auth_app()
     result = auth_app.acquire_token_by_authorization_code(
         code,
         scopes=SCOPE,
@@ -14,6 +14,8 @@ n8n workflow becomes: Trigger → Download → Call this endpoint
 
 import io
 import logging
+import os
+import tempfile
 import fitz  # PyMuPDF
 from flask import Blueprint, request, jsonify
 from typing import List, Dict, Any, Tuple
@@ -81,17 +83,17 @@ def is_pink_separator_page(page) -> bool:
         return False
 
 
-def analyze_pink_separators(pdf_bytes: bytes) -> List[Dict[str, Any]]:
+def analyze_pink_separators(pdf_path: str) -> List[Dict[str, Any]]:
     """
     Analyze PDF to find check boundaries based on pink separator pages.
     
     Args:
-        pdf_bytes: PDF file content
+        pdf_path: Path to the PDF file on disk
         
     Returns:
         List of check batches with start/end pages
     """
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    doc = fitz.open(pdf_path)
     total_pages = len(doc)
     
     logger.info(f"Analyzing {total_pages} pages for pink separators")
@@ -150,7 +152,7 @@ def analyze_pink_separators(pdf_bytes: bytes) -> List[Dict[str, Any]]:
 
 
 def split_pdf_into_pages(
-    pdf_bytes: bytes, 
+    pdf_path: str, 
     batch_number: str,
     batches: List[Dict[str, Any]]
 ) -> List[Dict[str, Any]]:
@@ -158,14 +160,14 @@ def split_pdf_into_pages(
     Split PDF into individual page files for each check batch.
     
     Args:
-        pdf_bytes: PDF file content
+        pdf_path: Path to the PDF file on disk
         batch_number: Batch number (e.g., "0000024")
         batches: List of check batches from analyze_pink_separators
         
     Returns:
         List of page dicts with filename and content
     """
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    doc = fitz.open(pdf_path)
     all_pages = []
     
     for batch in batches:
@@ -175,12 +177,11 @@ def split_pdf_into_pages(
         
         batch_folder = f"Batch {batch_number}-{check_num}"
         
-        # Create COMPLETE PDF (all pages in this check)
+        # Create COMPLETE PDF (all pages in this check, one range copy)
         complete_doc = fitz.open()
-        for page_num in range(start, end + 1):
-            complete_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
+        complete_doc.insert_pdf(doc, from_page=start, to_page=end)
         
-        complete_bytes = complete_doc.write()
+        complete_bytes = complete_doc.tobytes(garbage=0, deflate=True)
         complete_doc.close()
         
         all_pages.append({
@@ -195,7 +196,8 @@ def split_pdf_into_pages(
         for page_num in range(start, end + 1):
             page_doc = fitz.open()
             page_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
-            page_bytes = page_doc.write()
+            # Fresh document per page - nothing to garbage-collect, just compress streams for upload
+            page_bytes = page_doc.tobytes(garbage=0, deflate=True)
             page_doc.close()
             
             relative_page = page_num - start + 1
@@ -235,6 +237,8 @@ def process_batch():
     # Import here to avoid circular imports
     from services.one_drive_service import OneDriveService
     
+    pdf_path = None
+    
     try:
         # ---------------------------------------------------------------------
         # 1. VALIDATE INPUTS
@@ -266,9 +270,11 @@ def process_batch():
         
         logger.info(f"=== PROCESSING BATCH {batch_number_normalized} ===")
         
-        # Read PDF
-        pdf_bytes = pdf_file.read()
-        logger.info(f"Received PDF: {len(pdf_bytes)} bytes")
+        # Spool PDF to disk - MuPDF reads it from the file instead of a second in-memory copy
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+            pdf_file.save(tmp)
+            pdf_path = tmp.name
+        logger.info(f"Received PDF: {os.path.getsize(pdf_path)} bytes")
         
         # ---------------------------------------------------------------------
         # 2. INITIALIZE ONEDRIVE CLIENT
@@ -281,7 +287,7 @@ def process_batch():
         # ---------------------------------------------------------------------
         
         logger.info("Analyzing pink separators...")
-        batches = analyze_pink_separators(pdf_bytes)
+        batches = analyze_pink_separators(pdf_path)
         
         # ---------------------------------------------------------------------
         # 4. CREATE MAIN BATCH FOLDER
@@ -315,7 +321,7 @@ def process_batch():
         # ---------------------------------------------------------------------
         
         logger.info("Splitting PDF into pages...")
-        all_pages = split_pdf_into_pages(pdf_bytes, batch_number_normalized, batches)
+        all_pages = split_pdf_into_pages(pdf_path, batch_number_normalized, batches)
         
         # ---------------------------------------------------------------------
         # 7. CREATE CHECK SUBFOLDERS
@@ -336,28 +342,20 @@ def process_batch():
         
         logger.info(f"Uploading {len(all_pages)} files in parallel...")
         
-        upload_results = {
-            'successful': [],
-            'failed': []
-        }
-        
-        # Group pages by subfolder for parallel upload
-        for folder_name, subfolder_id in subfolder_ids.items():
-            folder_pages = [p for p in all_pages if p['batch_folder'] == folder_name]
-            
-            files_to_upload = [
-                {'filename': p['filename'], 'content': p['content']}
-                for p in folder_pages
-            ]
-            
-            results = onedrive.upload_files_parallel(
-                subfolder_id,
-                files_to_upload,
-                max_workers=5
-            )
-            
-            upload_results['successful'].extend(results['successful'])
-            upload_results['failed'].extend(results['failed'])
+        # One shared pool across every subfolder - pages of different checks upload concurrently
+        files_to_upload = [
+            {
+                'filename': p['filename'],
+                'content': p['content'],
+                'parent_id': subfolder_ids[p['batch_folder']]
+            }
+            for p in all_pages
+        ]
+        
+        upload_results = onedrive.upload_files_parallel_multi_folder(
+            files_to_upload,
+            max_workers=15
+        )
         
         # ---------------------------------------------------------------------
         # 9. RETURN RESULTS
@@ -398,6 +396,10 @@ def process_batch():
             'status': 'error',
             'error': str(e)
         }), 500
+    
+    finally:
+        if pdf_path:
+            os.unlink(pdf_path)
 
 
 # =============================================================================
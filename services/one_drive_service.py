@@ -7,11 +7,26 @@ Handles all OneDrive operations: folders, uploads, file management
 import requests
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from typing import Optional, List, Dict, Any
+from urllib3.util.retry import Retry
 import time
 
 logger = logging.getLogger(__name__)
 
+# Shared keep-alive session for Graph - uploads reuse pooled TLS connections instead of
+# handshaking per file. Pool is sized above the largest upload thread count (15).
+# Adapter retries cover connect failures and throttled/5xx reads only: PUT uploads are retried
+# by upload_file_with_retry, and read timeouts are never re-sent - either would stack another
+# full timeout onto every attempt
+_graph_session = requests.Session()
+_graph_session.mount('https://', HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, connect=3, read=0, backoff_factor=0.3,
+                      status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET', 'HEAD'])
+))
+
 
 class OneDriveService:
     """
@@ -30,6 +45,12 @@ class OneDriveService:
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json"
         }
+        # Built once per client - upload/download paths reuse these for every file
+        self.upload_headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/pdf"
+        }
+        self.auth_headers = {"Authorization": f"Bearer {access_token}"}
     
     # =========================================================================
     # FOLDER OPERATIONS
@@ -46,7 +67,7 @@ class OneDriveService:
             List of items (files and folders)
         """
         try:
-            response = requests.get(
+            response = _graph_session.get(
                 f"{self.base_url}/items/{folder_id}/children",
                 headers=self.headers,
                 timeout=30
@@ -87,7 +108,7 @@ class OneDriveService:
             New folder ID
         """
         try:
-            response = requests.post(
+            response = _graph_session.post(
                 f"{self.base_url}/items/{parent_id}/children",
                 headers=self.headers,
                 json={
@@ -139,12 +160,9 @@ class OneDriveService:
             OneDrive file metadata
         """
         try:
-            response = requests.put(
+            response = _graph_session.put(
                 f"{self.base_url}/items/{parent_id}:/{filename}:/content",
-                headers={
-                    "Authorization": f"Bearer {self.access_token}",
-                    "Content-Type": "application/pdf"
-                },
+                headers=self.upload_headers,
                 data=content,
                 timeout=60
             )
@@ -307,7 +325,7 @@ class OneDriveService:
             Updated file metadata
         """
         try:
-            response = requests.patch(
+            response = _graph_session.patch(
                 f"{self.base_url}/items/{file_id}",
                 headers=self.headers,
                 json={
@@ -335,9 +353,9 @@ class OneDriveService:
             File content as bytes
         """
         try:
-            response = requests.get(
+            response = _graph_session.get(
                 f"{self.base_url}/items/{file_id}/content",
-                headers={"Authorization": f"Bearer {self.access_token}"},
+                headers=self.auth_headers,
                 timeout=120
             )
             response.raise_for_status()
@@ -1,8 +1,16 @@
+import hashlib
+import threading
+from concurrent.futures import Future
 from functools import wraps
-from flask import session, redirect
-from utils.logger import get_auth_logger
+from flask import session, redirect, request, make_response, Response
+from utils.logger import get_auth_logger, get_api_logger
 
 auth_logger = get_auth_logger()
+api_logger = get_api_logger()
+
+# In-flight coalesced requests: (name, key) -> Future of (body, status, headers)
+_inflight = {}
+_inflight_lock = threading.Lock()
 
 def login_required(f):
     """Decorator to require authentication for routes"""
@@ -21,4 +29,40 @@ def login_required(f):
         if not session.get("user"):
             return redirect("/login")
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def coalesce_requests(name):
+    """
+    Decorator that collapses concurrent identical requests (same name + URL args, same user, same body).
+    The first request runs; duplicates that arrive while it's in flight get a copy of its response.
+    Requests from another user or with a different body always run on their own.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user = (session.get("user") or {}).get("preferred_username")
+            body_digest = hashlib.blake2b(request.get_data(), digest_size=16).digest()
+            key = (name, user, body_digest, args, tuple(sorted(kwargs.items())))
+            with _inflight_lock:
+                future = _inflight.get(key)
+                is_leader = future is None
+                if is_leader:
+                    future = _inflight[key] = Future()
+
+            if not is_leader:
+                api_logger.info("Coalescing duplicate %s request %s", name, args or kwargs)
+                body, status, headers = future.result()
+                return Response(body, status=status, headers=headers)
+
+            try:
+                response = make_response(f(*args, **kwargs))
+                future.set_result((response.get_data(), response.status_code, list(response.headers)))
+                return response
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with _inflight_lock:
+                    _inflight.pop(key, None)
+        return decorated_function
+    return decorator
@@ -0,0 +1,41 @@
+# utils/json_provider.py
+"""
+orjson-backed JSON serialization for Flask responses.
+
+Flask's default provider encodes and parses through the stdlib json module,
+which is slow on the large payloads handled by the batch endpoints (base64
+page PDFs, full check lists, n8n ingest bodies). orjson produces and reads
+the same JSON several times faster.
+"""
+
+import orjson
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+# Naive datetimes are treated as UTC so they serialize like utc_now_iso() values;
+# Decimal / UUID / dataclasses fall through to DefaultJSONProvider.default
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Drop-in JSON provider: jsonify() and request.get_json() both go through orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def orjson_bytes(payload):
+    """Encode a payload to JSON bytes with the same options as the app provider"""
+    return orjson.dumps(payload, default=DefaultJSONProvider.default, option=ORJSON_OPTIONS)
+
+
+def orjson_response(payload, status=200):
+    """Build a JSON response directly from orjson bytes (skips the str round trip)"""
+    return Response(
+        orjson_bytes(payload),
+        status=status,
+        mimetype='application/json'
+    )
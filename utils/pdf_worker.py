@@ -0,0 +1,173 @@
+# utils/pdf_worker.py
+"""
+CPU-bound MuPDF work that runs in a small pool of worker processes.
+
+Text extraction holds the GIL, and under gevent every request on a worker
+shares one OS thread, so a long scan in-process stalls all of them. The
+pool processes are spawned rather than forked (forking a gevent-patched
+worker leaves the child with a broken hub), and spawn re-imports whatever
+the submitted functions live in - so this module deliberately imports only
+fitz and the stdlib, never the Flask app, Supabase client or loggers.
+"""
+
+import contextlib
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+# Pool size per gunicorn worker. Every gunicorn worker owns its own pool, so the default splits
+# one process per CPU across the WEB_CONCURRENCY workers (gunicorn.conf.py) - usually 1 each
+_WEB_WORKERS = max(1, int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)))
+PDF_WORKER_PROCESSES = max(1, int(os.getenv('PDF_WORKER_PROCESSES', min(4, (os.cpu_count() or 1) // _WEB_WORKERS))))
+
+# Below this many pages the scan is one pool job instead of one per page range
+SEPARATOR_PARALLEL_MIN_PAGES = int(os.getenv('SEPARATOR_PARALLEL_MIN_PAGES', 40))
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+# Separator sheet keywords, grouped with their OCR misreads
+# A page is a separator when at least SEPARATOR_MIN_KEYWORDS groups appear
+SEPARATOR_KEYWORD_GROUPS = (
+    ("AUTOMATIC", "AUTOMATICA"),             # "AUTOMATICALLY"
+    ("SEPARAT", "SEPERAT"),                  # "SEPARATED"
+    ("SORT",),                               # "SORTED"
+    ("INDEX", "!NDEX", "1NDEX"),             # "INDEXED"
+    ("FOUNDATION", "FIUNDATION", "FUUNDATION"),
+    ("EXTRACT",),
+)
+SEPARATOR_MIN_KEYWORDS = 4
+
+# One alternation with a capture group per keyword group, scanned once per page in C.
+# Wrapped in a lookahead so overlapping keywords (e.g. "INDEXTRACT") are all seen,
+# matching plain substring tests. m.lastindex is the 1-based group that matched.
+# IGNORECASE replaces upper-casing each page, so the page text is never copied.
+SEPARATOR_RE = re.compile("(?=" + "|".join(
+    "(" + "|".join(re.escape(variant) for variant in variants) + ")"
+    for variants in SEPARATOR_KEYWORD_GROUPS
+) + ")", re.IGNORECASE)
+
+
+def separator_groups_hit(text):
+    """Bitmask of keyword groups found in page text (any case), from one regex pass"""
+    groups_hit = 0
+    for match in SEPARATOR_RE.finditer(text):
+        groups_hit |= 1 << match.lastindex
+        # Stop scanning as soon as enough groups are seen - the rest of the page can't change the answer
+        if groups_hit.bit_count() >= SEPARATOR_MIN_KEYWORDS:
+            break
+    return groups_hit
+
+
+def is_separator_text(text):
+    """Count distinct keyword groups in page text (any case)"""
+    return separator_groups_hit(text).bit_count() >= SEPARATOR_MIN_KEYWORDS
+
+
+def scan_separator_pages(pdf_path, first_page, last_page):
+    """
+    Return the separator page indices in [first_page, last_page).
+    Opens its own document - MuPDF documents can't be shared across scan workers.
+    """
+    found = []
+    with contextlib.closing(fitz.open(pdf_path)) as pdf_document:
+        for page_num in range(first_page, last_page):
+            page = pdf_document[page_num]
+
+            # Separator wording sits at the top of the sheet - extract the top half first.
+            # Plain extraction flags only - no ligature/whitespace preservation, nothing the keyword match needs
+            top_half = fitz.Rect(page.rect.x0, page.rect.y0, page.rect.x1, page.rect.y0 + page.rect.height / 2)
+            groups_hit = separator_groups_hit(page.get_text(flags=fitz.TEXT_MEDIABOX_CLIP, clip=top_half))
+
+            # Some but not enough keywords up top - confirm against the whole page
+            if 0 < groups_hit.bit_count() < SEPARATOR_MIN_KEYWORDS:
+                groups_hit = separator_groups_hit(page.get_text(flags=fitz.TEXT_MEDIABOX_CLIP))
+
+            if groups_hit.bit_count() >= SEPARATOR_MIN_KEYWORDS:
+                found.append(page_num)
+    return found
+
+
+def warm_up_pdf_pipeline():
+    """
+    Run MuPDF and the separator matcher once so the first upload
+    doesn't pay for page/font setup and the first automaton walk.
+    """
+    with contextlib.closing(fitz.open()) as scratch_pdf:
+        scratch_pdf.new_page()
+        pdf_bytes = scratch_pdf.tobytes()
+    with contextlib.closing(fitz.open(stream=pdf_bytes, filetype="pdf")) as reopened_pdf:
+        reopened_pdf[0].get_text(flags=fitz.TEXT_MEDIABOX_CLIP)
+    is_separator_text("AUTOMATICALLY SEPARATED AND SORTED")
+
+
+def start_pdf_worker_pool():
+    """
+    Create the process pool and spawn its workers now, at app startup, so the
+    first upload doesn't pay for interpreter start-up. Safe to call more than once.
+    """
+    global _pdf_pool
+    if multiprocessing.parent_process() is not None:
+        return None  # inside a pool worker - spawn re-imports __main__ (python app.py), never nest pools
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up_pdf_pipeline,
+            )
+            # Processes are started on submit - one no-op task per slot brings them all up
+            for _ in range(PDF_WORKER_PROCESSES):
+                _pdf_pool.submit(os.getpid)
+        return _pdf_pool
+
+
+def find_separator_pages(pdf_path, total_pages):
+    """
+    Scan all pages for separator sheets in the worker pool - even a single job keeps the
+    extraction off the gevent hub. Large PDFs are split into contiguous page ranges across
+    the processes, which re-open the spooled temp file by path so the PDF is never pickled.
+    """
+    pool = start_pdf_worker_pool()
+    if pool is None:
+        return scan_separator_pages(pdf_path, 0, total_pages)
+
+    if total_pages < SEPARATOR_PARALLEL_MIN_PAGES or PDF_WORKER_PROCESSES <= 1:
+        return pool.submit(scan_separator_pages, pdf_path, 0, total_pages).result()
+
+    step = -(-total_pages // PDF_WORKER_PROCESSES)  # ceil division
+    ranges = [(first, min(first + step, total_pages)) for first in range(0, total_pages, step)]
+
+    futures = [pool.submit(scan_separator_pages, pdf_path, first, last) for first, last in ranges]
+    # Ranges are contiguous and submitted in order, so the indices come back sorted
+    return [page_num for future in futures for page_num in future.result()]
+
+
+def merge_pdf_documents(pdf_blobs):
+    """
+    Append PDFs (bytes, or None for a page that couldn't be downloaded) into one document.
+    Returns (merged PDF bytes, indices of the blobs MuPDF couldn't read).
+    """
+    unreadable = []
+    with contextlib.closing(fitz.open()) as merged_pdf:
+        for idx, pdf_data in enumerate(pdf_blobs):
+            if pdf_data is None:
+                continue
+            try:
+                with contextlib.closing(fitz.open(stream=pdf_data, filetype="pdf")) as source_pdf:
+                    merged_pdf.insert_pdf(source_pdf)
+            except Exception:
+                unreadable.append(idx)
+        return merged_pdf.tobytes(garbage=3, deflate=True), unreadable
+
+
+def run_pdf_job(func, *args):
+    """Run a function from this module in the worker pool and wait for it (in-process if there is no pool)"""
+    pool = start_pdf_worker_pool()
+    if pool is None:
+        return func(*args)
+    return pool.submit(func, *args).result()
@@ -0,0 +1,17 @@
+"""
+=============================================================================
+WSGI ENTRY POINT - gunicorn + gevent
+=============================================================================
+Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+
+Monkey-patching must happen before anything imports socket/ssl/threading
+(requests, httpx, supabase), so it is the first statement here rather than
+in app.py. Blocking Supabase/Graph calls then yield to other greenlets and
+a handful of workers can serve many concurrent approvals.
+=============================================================================
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+from app import app  # noqa: E402